@@ -11,17 +11,39 @@ GRASS_COLOR = (167, 209, 61)
 GRASS_COLOR_ALT = (175, 215, 70)
 TEXT_COLOR = (56, 74, 12)
 
+# Rendering: present only the changed screen areas instead of the full frame
+DIRTY_RECT_RENDERING = True
+
 # Font settings
 FONT_SIZE = 25
 
 # Game speed (milliseconds between updates)
 GAME_SPEED = 150
 
+# Simulation ticks per second (fixed timestep), independent of the frame rate
+TICK_RATE = 1000 / GAME_SPEED
+FRAME_RATE = 60  # Upper bound on frames per second while waiting for input or network
+MAX_CATCH_UP_TICKS = 5  # Ticks run at once after a stall before dropping the backlog
+
 # Network settings
 DEFAULT_PORT = 5555
 MAX_PLAYERS = 5
-BUFFER_SIZE = 4096
+BUFFER_SIZE = 65536  # Bytes read per recv call (messages may be larger)
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024  # Largest accepted framed message
 SERVER_TIMEOUT = 30
+USE_UDP = False  # Send game states and inputs over a UDP side channel (lobby/control stays on TCP)
+UDP_MAX_DATAGRAM = 1200  # Largest datagram payload, below common path MTUs; bigger states go over TCP
+INPUT_REDUNDANCY = 4  # Unacknowledged inputs repeated in every input datagram
+UDP_HELLO_INTERVAL = 0.5  # Seconds between UDP handshake attempts
+SERVER_ENGINE = "asyncio"  # "asyncio" (single event loop) or "threaded" (thread per client)
+ALLOW_PICKLE = True  # Accept the legacy pickle codec (protocol 1.0); the dedicated server turns it off by default
+MAX_QUEUED_MESSAGES = 256  # Outgoing messages buffered per client before it is dropped
+KEYFRAME_INTERVAL = 20  # State snapshots between full keyframes (resync for late joiners)
+MAX_ROOMS = 32  # Independent matches a lobby server hosts at once (0 disables rooms)
+TIMER_WHEEL_RESOLUTION = 0.005  # Seconds per timer wheel slot: precision of room ticks
+TIMER_WHEEL_SLOTS = 512  # Slots in one turn of the timer wheel
+INBOX_DRAIN_LIMIT = 512  # Received messages handled per frame; the rest wait for the next one
+ROLLBACK_TICKS = 32  # Predicted ticks a client keeps (and may run ahead of the host) for rewind and replay
 
 # Game modes
 MODE_SINGLE_PLAYER = "single_player"
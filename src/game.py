@@ -1,6 +1,5 @@
 import pygame
 import os, sys
-from pygame.math import Vector2
 from src.ui.menu import run_menu
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -9,15 +8,20 @@ from src.sprites.snake import Snake
 from src.sprites.fruit import Fruit
 from src.sprites.button import Button
 from src.sprites.mines import Mines
+from src.sprites.assets import assets, blit_sprites
+from src.ui.hud import HudCache
 from src.services.dbhelper import DatabaseService
+from src.simulation import GameSimulation
+
+PLAYER1_KEYS = {pygame.K_w: 'up', pygame.K_s: 'down', pygame.K_d: 'right', pygame.K_a: 'left'}
+PLAYER2_KEYS = {pygame.K_UP: 'up', pygame.K_DOWN: 'down', pygame.K_RIGHT: 'right', pygame.K_LEFT: 'left'}
 
 class Game:
     def __init__(self, game_mode="two_player", p1_name="Player 1", p2_name="Player 2", sound="on", music="on"):
         self.screen = pygame.display.set_mode((CELL_NUMBER * CELL_SIZE, CELL_NUMBER * CELL_SIZE))
         self.clock = pygame.time.Clock()
-        font_path = os.path.join(BASE_DIR, "..", "assets", "Font", "PoetsenOne-Regular.ttf")
-        
-        self.game_font = pygame.font.Font(font_path, 50)
+        self.game_font = assets.font(size=50)
+        self.hud = HudCache()
         self.db_service = DatabaseService()
 
         
@@ -41,8 +45,14 @@ class Game:
         
         # Add mine object
         self.mine = Mines()
-        # Make sure the mine doesn't spawn in restricted areas initially
-        self.validate_mine_position()
+        
+        # Game rules run in the headless simulation, which also places the
+        # fruit and mine outside the restricted areas
+        snakes = {1: self.snake}
+        if self.snake2:
+            snakes[2] = self.snake2
+        self.simulation = GameSimulation(snakes=snakes, fruit=self.fruit, mine=self.mine)
+        self.pending_inputs = []
         
         # Game state
         self.game_state = 'start'
@@ -76,43 +86,6 @@ class Game:
         # Countdown
         self.countdown = 4
         self.last_countdown_tick = None
-        
-        # Set up timer event
-        self.SCREEN_UPDATE = pygame.USEREVENT
-        pygame.time.set_timer(self.SCREEN_UPDATE, 150)
-
-    def validate_mine_position(self):
-        # Regenerate mine position until it's valid
-        valid_position = False
-        while not valid_position:
-            # Check if mine is in restricted area (top rows, leftmost and rightmost)
-            in_restricted_area = False
-            
-            # Checking top 2 rows, leftmost and rightmost 3 columns
-            if self.mine.pos.y < 2:  # First two rows
-                if self.mine.pos.x < 3 or self.mine.pos.x >= CELL_NUMBER - 3:
-                    in_restricted_area = True
-            
-            # Check if mine is on the same position as fruit
-            on_fruit = self.mine.pos == self.fruit.pos
-            
-            # Check if mine is on snake bodies
-            on_snake = False
-            for block in self.snake.body:
-                if self.mine.pos == block:
-                    on_snake = True
-                    break
-                    
-            if self.game_mode == "two_player" and self.snake2:
-                for block in self.snake2.body:
-                    if self.mine.pos == block:
-                        on_snake = True
-                        break
-            
-            if not in_restricted_area and not on_fruit and not on_snake:
-                valid_position = True
-            else:
-                self.mine.randomize()  # Try a new position
 
     def update(self):
 
@@ -131,11 +104,21 @@ class Game:
                         pygame.mixer.music.set_volume(0.5)
                         pygame.mixer.music.play(-1)
         elif self.game_state == 'playing':
-            self.snake.move_snake()
-            if self.game_mode == "two_player" and self.snake2:
-                self.snake2.move_snake()
-            self.check_collision()
-            self.check_fail()
+            events = self.simulation.step(self.pending_inputs)
+            self.pending_inputs = []
+            self.handle_simulation_events(events)
+
+    def handle_simulation_events(self, events):
+        snakes = self.simulation.snakes
+        for event, value in events:
+            if event == 'crunch' and self.sound_enabled:
+                snakes[value].play_crunch_sound()
+            elif event == 'boom' and self.sound_enabled:
+                snakes[value].play_boom_sound()
+            elif event == 'hiss' and self.sound_enabled:
+                snakes[value].play_hiss_sound()
+            elif event == 'game_over':
+                self.game_over(value)
 
     def draw_elements(self):
         # print(f"Mine position: {self.mine.pos}")
@@ -145,16 +128,14 @@ class Game:
         elif self.game_state == 'countdown':
             self.draw_countdown()
         elif self.game_state == 'playing':
-            self.fruit.draw_fruit(self.screen, CELL_SIZE)
-            # Draw the mine
-            self.mine.draw_mine(self.screen, CELL_SIZE)
-            self.snake.draw_snake(self.screen, CELL_SIZE)
+            # Fruit, mine and snakes in one batched blit from the sprite atlas
+            sprites = [self.fruit, self.mine, self.snake]
             if self.game_mode == "two_player" and self.snake2:
-                self.snake2.draw_snake(self.screen, CELL_SIZE)
+                sprites.append(self.snake2)
+            blit_sprites(self.screen, sprites, CELL_SIZE)
         elif self.game_state == 'game_over':
             pygame.mixer.music.stop()
-            font_path = os.path.join(BASE_DIR, "..", "assets", "Font", "PoetsenOne-Regular.ttf")
-            font = pygame.font.Font(font_path, 50) 
+            font = self.game_font
 
             # Determine message based on winner
             if self.winner == 1:
@@ -170,7 +151,7 @@ class Game:
                 game_over_text = "Game Over"
                 text_color = (255, 0, 0)
 
-            game_over_surface = font.render(game_over_text, True, text_color)  
+            game_over_surface = assets.text(font, game_over_text, text_color)
             text_rect = game_over_surface.get_rect(center=self.game_over_txt_pos)  
             self.screen.blit(game_over_surface, text_rect)
 
@@ -184,12 +165,13 @@ class Game:
         snake_size = 40  
         padding = 10  
         bottom_padding = 2  
+        self.hud_rects = []
 
         # Player 1 (Left)
         score_text_p1 = str(len(self.snake.body) - 3)  
-        score_surface_p1 = self.game_font.render(score_text_p1, True, (56, 74, 12))
+        score_surface_p1 = self.hud.label(('score', 1), self.game_font, score_text_p1, (56, 74, 12))
 
-        snake_image_p1 = pygame.transform.scale(self.fruit.p1, (snake_size, snake_size))
+        snake_image_p1 = self.hud.icon(self.fruit.p1, (snake_size, snake_size))
         snake_rect_p1 = snake_image_p1.get_rect(midleft=(margin, margin + 12))
         score_rect_p1 = score_surface_p1.get_rect(midleft=(snake_rect_p1.right + 10, snake_rect_p1.centery))
 
@@ -204,14 +186,15 @@ class Game:
         pygame.draw.rect(self.screen, (56, 74, 12), bg_rect_p1, 2, border_radius=8)
         self.screen.blit(snake_image_p1, snake_rect_p1)
         self.screen.blit(score_surface_p1, score_rect_p1)
+        self.hud_rects.append(bg_rect_p1)
 
         # Only draw Player 2's score in two-player mode
         if self.game_mode == "two_player" and self.snake2:
             # Player 2 (Right)
             score_text_p2 = str(len(self.snake2.body) - 3)  
-            score_surface_p2 = self.game_font.render(score_text_p2, True, (56, 74, 12))
+            score_surface_p2 = self.hud.label(('score', 2), self.game_font, score_text_p2, (56, 74, 12))
         
-            snake_image_p2 = pygame.transform.scale(self.fruit.p2, (snake_size, snake_size))
+            snake_image_p2 = self.hud.icon(self.fruit.p2, (snake_size, snake_size))
             score_rect_p2 = score_surface_p2.get_rect(midright=(CELL_SIZE * CELL_NUMBER - margin, margin + 12))
             snake_rect_p2 = snake_image_p2.get_rect(midright=(score_rect_p2.left - 10, score_rect_p2.centery))
 
@@ -226,162 +209,14 @@ class Game:
             pygame.draw.rect(self.screen, (56, 74, 12), bg_rect_p2, 2, border_radius=8)
             self.screen.blit(snake_image_p2, snake_rect_p2)
             self.screen.blit(score_surface_p2, score_rect_p2)
+            self.hud_rects.append(bg_rect_p2)
 
     def draw_countdown(self):
-        countdown_text = self.game_font.render(str(self.countdown), True, (255, 255, 255))
+        countdown_text = assets.text(self.game_font, str(self.countdown), (255, 255, 255))
         countdown_rect = countdown_text.get_rect(center=(CELL_NUMBER * CELL_SIZE // 2, CELL_NUMBER * CELL_SIZE // 2))
         self.screen.blit(countdown_text, countdown_rect)
 
 
-    def check_collision(self):
-        # Check if snakes eat fruit
-        if self.fruit.pos == self.snake.body[0]:
-            self.fruit.randomize()
-            self.snake.add_block()
-            if self.sound_enabled:
-                self.snake.play_crunch_sound()
-            
-        if self.game_mode == "two_player" and self.snake2 and self.fruit.pos == self.snake2.body[0]:
-            self.fruit.randomize()
-            self.snake2.add_block()
-            if self.sound_enabled:
-                self.snake2.play_crunch_sound()
-        
-        # Check if snakes hit mines
-        if self.mine.pos == self.snake.body[0]:
-            if self.sound_enabled:
-                self.snake.play_boom_sound()
-            if len(self.snake.body) >= 5:
-                self.snake.body.pop()
-                self.snake.body.pop()
-            elif len(self.snake.body) == 4:
-                self.snake.body.pop()
-            elif len(self.snake.body) == 3:
-                if self.game_mode == "two_player":
-                    self.game_over(2)
-                else:
-                    self.game_over(3)
-            # Reposition the mine
-            self.mine.randomize()
-            self.validate_mine_position()
-            
-        if self.game_mode == "two_player" and self.snake2 and self.mine.pos == self.snake2.body[0]:
-            if self.sound_enabled:
-                self.snake.play_boom_sound()
-            if len(self.snake2.body) >= 5:  # Ensure the snake keeps at least 3 blocks (minimum length)
-                self.snake2.body.pop()
-                self.snake2.body.pop()
-            elif len(self.snake2.body) == 4:
-                self.snake2.body.pop()
-            elif len(self.snake2.body) == 3:
-                self.game_over(1)
-            # Reposition the mine
-            self.mine.randomize()
-            self.validate_mine_position()
-            
-        # Make sure fruit doesn't spawn on snake bodies or the mine
-        for block in self.snake.body[1:]:
-            if block == self.fruit.pos:
-                self.fruit.randomize()
-                
-        if self.game_mode == "two_player" and self.snake2:
-            for block in self.snake2.body[1:]:
-                if block == self.fruit.pos:
-                    self.fruit.randomize()
-        
-        # Check if fruit spawned on mine
-        if self.fruit.pos == self.mine.pos:
-            self.fruit.randomize()
-        
-        # Apple spawning behind score fix
-        for y in range(2):
-            for x in range(3):
-                if self.fruit.pos == (x, y):
-                    self.fruit.randomize()
-
-            for x in range(CELL_NUMBER - 3, CELL_NUMBER):
-                if self.fruit.pos == (x, y):
-                    self.fruit.randomize()
-                    
-        # Mine spawning behind score fix and in restricted areas
-        for y in range(2):
-            for x in range(3):
-                if self.mine.pos == (x, y):
-                    self.mine.randomize()
-                    self.validate_mine_position()
-
-            for x in range(CELL_NUMBER - 3, CELL_NUMBER):
-                if self.mine.pos == (x, y):
-                    self.mine.randomize()
-                    self.validate_mine_position()
-
-
-    def check_fail(self):
-        snake1_dead = False
-        snake2_dead = False
-
-        # Snake 1 hits walls
-        if not 0 <= self.snake.body[0].x < CELL_NUMBER or not 0 <= self.snake.body[0].y < CELL_NUMBER:
-            print("Snake 1 hit the wall")
-            snake1_dead = True
-                
-        # Snake 1 hits its own body
-        for block in self.snake.body[1:]:
-            if block.x == self.snake.body[0].x and block.y == self.snake.body[0].y:
-                print("Snake 1 hit itself")
-                snake1_dead = True
-
-        if self.game_mode == "two_player" and self.snake2:
-            # Snake 2 hits walls
-            if not 0 <= self.snake2.body[0].x < CELL_NUMBER or not 0 <= self.snake2.body[0].y < CELL_NUMBER:
-                print("Snake 2 hit the wall")
-                snake2_dead = True
-
-            # Snake 2 hits its own body
-            for block in self.snake2.body[1:]:
-                if block.x == self.snake2.body[0].x and block.y == self.snake2.body[0].y:
-                    print("Snake 2 hit itself")
-                    snake2_dead = True
-
-            # Snake 1 hits Snake 2
-            for block in self.snake2.body:
-                if block.x == self.snake.body[0].x and block.y == self.snake.body[0].y:
-                    self.snake.play_hiss_sound()
-                    print("Snake 1 hit Snake 2's body")
-                    snake1_dead = True
-
-            # Snake 2 hits Snake 1
-            for block in self.snake.body:
-                if block.x == self.snake2.body[0].x and block.y == self.snake2.body[0].y:
-                    self.snake2.play_hiss_sound()
-                    print("Snake 2 hit Snake 1's body")
-                    snake2_dead = True
-
-        # Handle game over conditions
-        if self.game_mode == "single_player":
-            if snake1_dead:
-                self.game_over(3)  # Game over in single player
-        else:
-            # Two-player mode logic
-            if snake1_dead and snake2_dead:
-                snake1_score = len(self.snake.body) - 3
-                snake2_score = len(self.snake2.body) - 3
-
-                print(f"Scores -> Snake 1: {snake1_score}, Snake 2: {snake2_score}")
-                
-                if snake1_score > snake2_score:
-                    self.game_over(1)  # Snake 1 wins
-                elif snake1_score < snake2_score:
-                    self.game_over(2)  # Snake 2 wins
-                else:
-                    self.game_over(0)  # It's a tie
-            elif snake1_dead:
-                self.game_over(2)  # Snake 2 wins
-            elif snake2_dead:
-                self.game_over(1)  # Snake 1 wins
-
-
-
     def game_over(self, winner):
         self.game_state = 'game_over'
         self.winner = winner
@@ -406,12 +241,8 @@ class Game:
                 self.db_service.update_multiplayer_win(self.p2_name)
 
     def reset_game(self):
-        self.snake.reset(start_position=(3, 10), player_number=1)
-        if self.game_mode == "two_player" and self.snake2:
-            self.snake2.reset(start_position=(22, 10), player_number=2)
-        self.fruit.randomize()
-        self.mine.randomize()
-        self.validate_mine_position()
+        self.simulation.reset()
+        self.pending_inputs = []
         self.start_countdown()
 
     def start_countdown(self):
@@ -420,18 +251,8 @@ class Game:
         self.last_countdown_tick = None
 
     def draw_grass(self):
-        for row in range(CELL_NUMBER):
-            if row % 2 == 0:   
-                for col in range(CELL_NUMBER):
-                    if col % 2 == 0:
-                        grass_rect = pygame.Rect(col * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                        pygame.draw.rect(self.screen, GRASS_COLOR, grass_rect)
-            else:
-                for col in range(CELL_NUMBER):
-                    if col % 2 != 0:
-                        grass_rect = pygame.Rect(col * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                        pygame.draw.rect(self.screen, GRASS_COLOR, grass_rect)
-                        
+        self.screen.blit(assets.grass(CELL_NUMBER, CELL_SIZE, GRASS_COLOR, GRASS_COLOR_ALT), (0, 0))
+
     def handle_input(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN:
             if self.game_state == 'start':
@@ -449,30 +270,9 @@ class Game:
                     
         if self.game_state == 'playing' and event.type == pygame.KEYDOWN:
             # Player 1 controls (WASD)
-            if event.key == pygame.K_w:
-                if self.snake.direction.y != 1:
-                    self.snake.direction = Vector2(0, -1)
-            if event.key == pygame.K_s:
-                if self.snake.direction.y != -1:
-                    self.snake.direction = Vector2(0, 1)
-            if event.key == pygame.K_d:
-                if self.snake.direction.x != -1:
-                    self.snake.direction = Vector2(1, 0)
-            if event.key == pygame.K_a:
-                if self.snake.direction.x != 1:
-                    self.snake.direction = Vector2(-1, 0)
+            if event.key in PLAYER1_KEYS:
+                self.pending_inputs.append((1, PLAYER1_KEYS[event.key]))
                     
             # Player 2 controls (Arrow keys) - only in two-player mode
-            if self.game_mode == "two_player" and self.snake2:
-                if event.key == pygame.K_UP:
-                    if self.snake2.direction.y != 1:
-                        self.snake2.direction = Vector2(0, -1)
-                if event.key == pygame.K_DOWN:
-                    if self.snake2.direction.y != -1:
-                        self.snake2.direction = Vector2(0, 1)
-                if event.key == pygame.K_RIGHT:
-                    if self.snake2.direction.x != -1:
-                        self.snake2.direction = Vector2(1, 0)
-                if event.key == pygame.K_LEFT:
-                    if self.snake2.direction.x != 1:
-                        self.snake2.direction = Vector2(-1, 0)
\ No newline at end of file
+            if self.game_mode == "two_player" and self.snake2 and event.key in PLAYER2_KEYS:
+                self.pending_inputs.append((2, PLAYER2_KEYS[event.key]))
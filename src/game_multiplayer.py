@@ -1,30 +1,53 @@
 import pygame
 import os
 import sys
-from pygame.math import Vector2
-from src.constants import CELL_SIZE, CELL_NUMBER, GRASS_COLOR, GRASS_COLOR_ALT
+from src.constants import CELL_SIZE, CELL_NUMBER, GRASS_COLOR, GRASS_COLOR_ALT, USE_UDP, TICK_RATE
 from src.sprites.snake import Snake
 from src.sprites.fruit import Fruit
 from src.sprites.button import Button
 from src.sprites.mines import Mines
+from src.sprites.assets import assets, blit_sprites
+from src.ui.hud import HudCache
 from src.services.dbhelper import DatabaseService
-from src.services.network import GameClient, GameServer
+from src.services.network import GameClient, create_server
 from src.services.protocol import GameProtocol
+from src.services.match import Match
+from src.services.prediction import SnakePredictor
+from src.simulation import GameSimulation
+
+# Teclas de cada jugador local -> nombre de input enviado por red
+PLAYER_KEYS = {
+    1: {pygame.K_w: 'up', pygame.K_s: 'down', pygame.K_a: 'left', pygame.K_d: 'right'},          # WASD
+    2: {pygame.K_UP: 'up', pygame.K_DOWN: 'down', pygame.K_LEFT: 'left', pygame.K_RIGHT: 'right'},  # Flechas
+    3: {pygame.K_i: 'up', pygame.K_k: 'down', pygame.K_j: 'left', pygame.K_l: 'right'},          # IJKL
+    4: {pygame.K_8: 'up', pygame.K_5: 'down', pygame.K_4: 'left', pygame.K_6: 'right'},          # Numpad 8456
+    5: {pygame.K_t: 'up', pygame.K_g: 'down', pygame.K_f: 'left', pygame.K_h: 'right'},          # TFGH
+}
+
+# Veces que se vuelve a pedir la lista de salas si otro jugador se adelantó
+MAX_ROOM_ATTEMPTS = 3
 
 class MultiplayerGame:
     def __init__(self, game_mode="multiplayer_host", p1_name="Player 1", p2_name="Player 2", 
-                 sound="on", music="on", host=None, port=5555, is_host=True):
+                 sound="on", music="on", host=None, port=5555, is_host=True, use_udp=USE_UDP, room=None,
+                 tick_rate=TICK_RATE):
         
         # Configuración de pantalla
         self.screen = pygame.display.set_mode((CELL_NUMBER * CELL_SIZE, CELL_NUMBER * CELL_SIZE))
         self.clock = pygame.time.Clock()
-        font_path = os.path.join(os.path.dirname(__file__), "..", "assets", "Font", "PoetsenOne-Regular.ttf")
-        self.game_font = pygame.font.Font(font_path, 50)
+        self.game_font = assets.font(size=50)
+        self.hud = HudCache()  # Iconos, fuentes y textos del marcador ya renderizados
         
         # Configuración de red
         self.is_host = is_host
         self.host = host
         self.port = port
+        self.use_udp = use_udp  # Estados e inputs por UDP (el lobby sigue por TCP)
+        self.room = room  # Sala a crear o unirse en un servidor con salas
+        self.server_error = None  # Último error del servidor (p. ej. sala llena)
+        self.room_attempts = 0  # Intentos de entrar en una sala (la lista puede estar desactualizada)
+        # Ritmo de ticks: el del servidor de la partida, anunciado en 'game_start'
+        self.tick_rate = tick_rate
         self.client = None
         self.server = None
         self.protocol = GameProtocol()
@@ -42,6 +65,9 @@ class MultiplayerGame:
         self.player_number = 1 if is_host else None  # Se asignará cuando se conecte
         self.game_can_start = False
         
+        # Cada jugador predice su serpiente; la partida real la ejecuta el servidor
+        self.predictor = None
+        
         # Inicializar objetos del juego para 5 jugadores
         self._initialize_game_objects()
         
@@ -52,44 +78,22 @@ class MultiplayerGame:
         self.countdown = 4
         self.last_countdown_tick = None
         
-        # Timer para updates
-        self.SCREEN_UPDATE = pygame.USEREVENT
-        pygame.time.set_timer(self.SCREEN_UPDATE, 150)
-        
         # Conectar a red
         self._connect_to_network()
 
     def _initialize_game_objects(self):
         """Inicializar objetos del juego para 5 jugadores"""
-        # Posiciones iniciales para 5 jugadores
-        start_positions = [
-            (3, 10),   # Jugador 1 - Esquina superior izquierda
-            (22, 10),  # Jugador 2 - Esquina superior derecha  
-            (3, 20),   # Jugador 3 - Esquina inferior izquierda
-            (22, 20),  # Jugador 4 - Esquina inferior derecha
-            (12, 15)   # Jugador 5 - Centro
-        ]
-        
-        # Direcciones iniciales
-        start_directions = [
-            Vector2(1, 0),   # Jugador 1 - Derecha
-            Vector2(-1, 0),  # Jugador 2 - Izquierda
-            Vector2(1, 0),   # Jugador 3 - Derecha  
-            Vector2(-1, 0),  # Jugador 4 - Izquierda
-            Vector2(0, -1)   # Jugador 5 - Arriba
-        ]
-        
-        # Inicializar serpientes para 5 jugadores
-        self.snakes = {}
-        for i in range(1, 6):  # Jugadores 1-5
-            self.snakes[i] = Snake(start_position=start_positions[i-1], player_number=i)
-            self.snakes[i].direction = start_directions[i-1]
+        # Inicializar serpientes para 5 jugadores (posición y dirección según START_POSITIONS)
+        # Solo las de los jugadores de la partida del servidor están en self.snakes; el resto es None
+        self._snake_pool = {i: Snake(start_position=None, player_number=i) for i in range(1, 6)}  # Jugadores 1-5
+        self.snakes = dict(self._snake_pool)
         
         # Fruta y mina
         self.fruit = Fruit()
         self.mine = Mines()
-        if self.is_host:
-            self.validate_mine_position()
+        
+        # Reglas del juego (aquí solo para dibujar: el servidor avanza la simulación)
+        self.simulation = GameSimulation(snakes=self.snakes, fruit=self.fruit, mine=self.mine)
         
         # Nombres de jugadores (se actualizarán con los nombres reales)
         self.player_names = {
@@ -138,8 +142,10 @@ class MultiplayerGame:
         try:
             if self.is_host:
                 # El host crea servidor y se conecta como cliente
-                self.server = GameServer(host='0.0.0.0', port=self.port)
+                self.server = create_server(host='0.0.0.0', port=self.port, udp=self.use_udp)
                 if self.server.start_server():
+                    # El servidor ejecuta la partida: aplica los inputs y difunde el estado
+                    self.server.host_match(Match(game_mode=self.game_mode), self.tick_rate)
                     self.connection_status = f"Servidor creado en puerto {self.port}. Esperando jugadores..."
                     print(self.connection_status)
                 else:
@@ -148,7 +154,7 @@ class MultiplayerGame:
                     return
             
             # Todos los jugadores (incluido host) se conectan como clientes
-            self.client = GameClient()
+            self.client = GameClient(use_udp=self.use_udp)
             connect_host = 'localhost' if self.is_host else self.host
             
             if self.client.connect_to_server(connect_host, self.port):
@@ -161,6 +167,9 @@ class MultiplayerGame:
                 else:
                     # Los clientes envían su nombre (usarán player2_name como su nombre)
                     self.client.send_player_name(self.p2_name)
+                if self.room:
+                    # Servidor con salas: entrar en la indicada (se crea si no existe)
+                    self.client.create_room(self.room)
                     
             else:
                 self.connection_status = f"Error conectando a {connect_host}:{self.port}"
@@ -171,6 +180,48 @@ class MultiplayerGame:
             self.connection_status = f"Error: {str(e)}"
             self.game_state = 'connection_failed'
 
+    def assign_player(self, player_number):
+        """Número de jugador asignado por el servidor"""
+        self.player_number = player_number
+        self.predictor = SnakePredictor(player_number)
+        print(f"🔮 Predicción local activada para el jugador {player_number}")
+
+    def set_active_players(self, players):
+        """Mostrar solo las serpientes de los jugadores que están en la partida del servidor"""
+        for player_num, snake in self._snake_pool.items():
+            self.snakes[player_num] = snake if player_num in players else None
+
+    def choose_room(self, rooms):
+        """
+        Servidor con salas: sin --room, entrar en la primera sala con sitio
+        (mejor si aún no empezó su partida) o crear una nueva
+        """
+        if self.room or not self.client or self.client.room_id is not None:
+            return
+        self.room_attempts += 1
+        free = [room for room in rooms if room['players'] < room['max_players']]
+        free.sort(key=lambda room: room['game_state'] != 'start')
+        if free:
+            print(f"🏠 Entrando en la sala '{free[0]['name']}'")
+            self.client.join_room(free[0]['room_id'])
+        else:
+            self.client.create_room(f"Sala de {self.p2_name}")
+
+    def show_error(self, message):
+        """Mostrar en la pantalla de conexión un error enviado por el servidor"""
+        self.server_error = f"❌ {message}"
+        self.connection_status = self.server_error
+        if (not self.room and self.client and self.client.room_id is None
+                and self.room_attempts < MAX_ROOM_ATTEMPTS):
+            # Otro jugador ocupó la sala (o el último hueco) antes: volver a elegir
+            self.client.list_rooms()
+
+    def set_tick_rate(self, tick_rate):
+        """Predecir al ritmo de la partida del servidor (run_game ajusta su TickScheduler)"""
+        if tick_rate != self.tick_rate:
+            print(f"⏱️ Ritmo del servidor: {tick_rate:.2f} ticks/s")
+        self.tick_rate = tick_rate
+
     def update_player_name(self, player_number, name):
         """Actualizar nombre de jugador recibido por red"""
         if 1 <= player_number <= 5:
@@ -189,11 +240,16 @@ class MultiplayerGame:
     def _handle_connecting_state(self):
         """Manejar estado de conexión"""
         if self.client and self.client.connected:
-            # Si somos host y hay al menos 2 jugadores, permitir inicio
+            # Si somos host y hay al menos 2 jugadores, mostrar el botón de inicio
             if self.is_host and self.game_can_start:
-                self.connection_status = f"✅ {self.client.connected_players}/5 jugadores - Click 'Start Game'"
+                self.connection_status = f"✅ {self.client.players_label()} jugadores - Click 'Start Game'"
+                self.game_state = 'start'
+            elif not self.is_host and self.client.room_id is not None:
+                # Servidor con salas: la partida empieza sola al reunir jugadores
+                self.server_error = None
+                self.connection_status = "✅ En la sala - Esperando más jugadores"
             elif not self.is_host:
-                self.connection_status = f"✅ Conectado - Esperando que el host inicie el juego"
+                self.connection_status = self.server_error or "✅ Conectado - Esperando que el host inicie el juego"
 
     def _handle_countdown(self):
         """Manejar cuenta regresiva"""
@@ -202,10 +258,6 @@ class MultiplayerGame:
             self.countdown -= 1
             self.last_countdown_tick = current_time
             
-            # Sincronizar cuenta regresiva si somos host
-            if self.is_host and self.client:
-                self.client.send_game_state(self)
-            
             if self.countdown <= 0:
                 self.game_state = 'playing'
                 if self.music_enabled:
@@ -213,19 +265,10 @@ class MultiplayerGame:
 
     def _handle_playing_state(self):
         """Manejar estado de juego activo para 5 jugadores"""
-        # Solo el host ejecuta la lógica del juego
-        if self.is_host:
-            # Mover todas las serpientes activas
-            for snake in self.snakes.values():
-                if snake:  # Solo mover serpientes que existen
-                    snake.move_snake()
-            
-            self.check_collision()
-            self.check_fail()
-            
-            # Sincronizar estado con clientes
-            if self.client:
-                self.client.send_game_state(self)
+        # El servidor ejecuta la lógica del juego; cada jugador adelanta su propia
+        # serpiente sin esperar al siguiente estado
+        if self.predictor:
+            self.predictor.step(self.snakes[self.player_number], self.fruit.pos)
 
     def handle_network_messages(self):
         """Procesar mensajes de red"""
@@ -242,166 +285,14 @@ class MultiplayerGame:
         except Exception as e:
             print(f"❌ Error cargando música: {e}")
 
-    # Métodos del juego (solo ejecutados por el host)
-    def validate_mine_position(self):
-        """Validar posición de la mina (solo host)"""
-        if not self.is_host:
-            return
-            
-        valid_position = False
-        while not valid_position:
-            in_restricted_area = False
-            
-            if self.mine.pos.y < 2:
-                if self.mine.pos.x < 3 or self.mine.pos.x >= CELL_NUMBER - 3:
-                    in_restricted_area = True
-            
-            on_fruit = self.mine.pos == self.fruit.pos
-            
-            # Verificar colisión con cualquier serpiente
-            on_snake = False
-            for snake in self.snakes.values():
-                if snake and any(self.mine.pos == block for block in snake.body):
-                    on_snake = True
-                    break
-            
-            if not in_restricted_area and not on_fruit and not on_snake:
-                valid_position = True
-            else:
-                self.mine.randomize()
-
-    def check_collision(self):
-        """Verificar colisiones (solo host)"""
-        if not self.is_host:
-            return
-            
-        # Colisiones con fruta
-        for player_num, snake in self.snakes.items():
-            if snake and self.fruit.pos == snake.body[0]:
-                self.fruit.randomize()
-                snake.add_block()
-                if self.sound_enabled:
-                    snake.play_crunch_sound()
-        
-        # Colisiones con minas
-        for player_num, snake in self.snakes.items():
-            if snake and self.mine.pos == snake.body[0]:
-                if self.sound_enabled:
-                    snake.play_boom_sound()
-                self._handle_mine_collision(snake, player_num)
-            
-        # Validar posiciones
-        self._validate_positions()
-
-    def _handle_mine_collision(self, snake, player_num):
-        """Manejar colisión con mina"""
-        if len(snake.body) >= 5:
-            snake.body.pop()
-            snake.body.pop()
-        elif len(snake.body) == 4:
-            snake.body.pop()
-        elif len(snake.body) == 3:
-            # Determinar ganador (el jugador con más puntos)
-            self._determine_winner()
-        
-        self.mine.randomize()
-        self.validate_mine_position()
-
-    def _determine_winner(self):
-        """Determinar ganador entre todos los jugadores"""
-        scores = {}
-        for player_num, snake in self.snakes.items():
-            if snake:
-                scores[player_num] = len(snake.body) - 3
-        
-        # Encontrar jugador con máxima puntuación
-        max_score = max(scores.values()) if scores else 0
-        winners = [player_num for player_num, score in scores.items() if score == max_score]
-        
-        if len(winners) == 1:
-            self.game_over(winners[0])
-        else:
-            self.game_over(0)  # Empate
-
-    def _validate_positions(self):
-        """Validar posiciones de fruta y mina"""
-        # Obtener todos los bloques de todas las serpientes
-        all_blocks = []
-        for snake in self.snakes.values():
-            if snake:
-                all_blocks.extend(snake.body[1:])  # Excluir cabezas
-        
-        # Evitar que fruta aparezca en cuerpos de serpientes
-        for block in all_blocks:
-            if block == self.fruit.pos:
-                self.fruit.randomize()
-                break
-        
-        # Evitar que fruta y mina estén en la misma posición
-        if self.fruit.pos == self.mine.pos:
-            self.fruit.randomize()
-            
-        # Evitar áreas restringidas
-        for y in range(2):
-            for x in range(3):
-                if self.fruit.pos == (x, y) or self.mine.pos == (x, y):
-                    if self.fruit.pos == (x, y):
-                        self.fruit.randomize()
-                    if self.mine.pos == (x, y):
-                        self.mine.randomize()
-                        self.validate_mine_position()
-
-            for x in range(CELL_NUMBER - 3, CELL_NUMBER):
-                if self.fruit.pos == (x, y) or self.mine.pos == (x, y):
-                    if self.fruit.pos == (x, y):
-                        self.fruit.randomize()
-                    if self.mine.pos == (x, y):
-                        self.mine.randomize()
-                        self.validate_mine_position()
-
-    def check_fail(self):
-        """Verificar condiciones de fin de juego (solo host)"""
-        if not self.is_host:
-            return
-            
-        dead_players = []
-        
-        for player_num, snake in self.snakes.items():
-            if snake and self._is_snake_dead(snake, player_num):
-                dead_players.append(player_num)
-        
-        # Si todos los jugadores están muertos, determinar ganador
-        if dead_players and len(dead_players) == len([s for s in self.snakes.values() if s]):
-            self._determine_winner()
-
-    def _is_snake_dead(self, snake, player_num):
-        """Verificar si una serpiente está muerta"""
-        # Colisión con paredes
-        if not 0 <= snake.body[0].x < CELL_NUMBER or not 0 <= snake.body[0].y < CELL_NUMBER:
-            return True
-            
-        # Colisión consigo misma
-        for block in snake.body[1:]:
-            if block == snake.body[0]:
-                return True
-                
-        # Colisión con otras serpientes
-        for other_player_num, other_snake in self.snakes.items():
-            if other_snake and other_player_num != player_num:
-                for block in other_snake.body:
-                    if block == snake.body[0]:
-                        if hasattr(snake, 'play_hiss_sound'):
-                            snake.play_hiss_sound()
-                        return True
-                
-        return False
-
     def game_over(self, winner):
-        """Manejar fin del juego"""
+        """Fin del juego anunciado por el servidor"""
         self.game_state = 'game_over'
         self.winner = winner
+        if not self.is_host:
+            return
         
-        # Actualizar base de datos para todos los jugadores
+        # El host guarda los resultados de todos los jugadores
         for player_num, snake in self.snakes.items():
             if snake and player_num in self.player_names:
                 score = len(snake.body) - 3
@@ -409,10 +300,6 @@ class MultiplayerGame:
         
         if winner != 0 and winner in self.player_names:
             self.db_service.update_multiplayer_win(self.player_names[winner])
-            
-        # Notificar a clientes
-        if self.is_host and self.client:
-            self.client.send_game_state(self)
 
     def start_countdown(self):
         """Iniciar cuenta regresiva"""
@@ -422,19 +309,12 @@ class MultiplayerGame:
 
     def reset_game(self):
         """Reiniciar juego"""
-        # Reiniciar todas las serpientes
-        start_positions = [(3, 10), (22, 10), (3, 20), (22, 20), (12, 15)]
-        start_directions = [Vector2(1, 0), Vector2(-1, 0), Vector2(1, 0), Vector2(-1, 0), Vector2(0, -1)]
-        
-        for i in range(1, 6):
-            if i in self.snakes:
-                self.snakes[i].reset(start_position=start_positions[i-1], player_number=i)
-                self.snakes[i].direction = start_directions[i-1]
-        
-        self.fruit.randomize()
-        self.mine.randomize()
-        if self.is_host:
-            self.validate_mine_position()
+        if self.is_host and self.client:
+            # El servidor reinicia la partida y avisa a todos con game_start
+            self.client.request_game_start()
+            return
+        # Reiniciar serpientes, fruta y mina
+        self.simulation.reset()
         self.start_countdown()
 
     # Métodos de dibujo para 5 jugadores
@@ -450,13 +330,8 @@ class MultiplayerGame:
         elif self.game_state == 'countdown':
             self.draw_countdown()
         elif self.game_state == 'playing':
-            self.fruit.draw_fruit(self.screen, CELL_SIZE)
-            self.mine.draw_mine(self.screen, CELL_SIZE)
-            
-            # Dibujar todas las serpientes activas
-            for snake in self.snakes.values():
-                if snake:
-                    snake.draw_snake(self.screen, CELL_SIZE)
+            # Fruta, mina y todas las serpientes en un solo blits() desde el atlas
+            blit_sprites(self.screen, [self.fruit, self.mine] + list(self.snakes.values()), CELL_SIZE)
                     
         elif self.game_state == 'game_over':
             if pygame.mixer.get_init():
@@ -467,21 +342,21 @@ class MultiplayerGame:
 
     def draw_connection_screen(self):
         """Dibujar pantalla de conexión"""
-        font = pygame.font.Font(None, 36)
+        font = assets.font(None, 36)
         
         # Mostrar estado de conexión
-        status_text = font.render(self.connection_status, True, (255, 255, 255))
+        status_text = assets.text(font, self.connection_status, (255, 255, 255))
         status_rect = status_text.get_rect(center=(CELL_NUMBER * CELL_SIZE // 2, CELL_NUMBER * CELL_SIZE // 2 - 50))
         self.screen.blit(status_text, status_rect)
         
         # Mostrar información adicional para host
         if self.is_host and hasattr(self, 'client') and self.client:
-            players_text = font.render(f"Jugadores conectados: {self.client.connected_players}/5", True, (200, 200, 100))
+            players_text = assets.text(font, f"Jugadores conectados: {self.client.players_label()}", (200, 200, 100))
             players_rect = players_text.get_rect(center=(CELL_NUMBER * CELL_SIZE // 2, CELL_NUMBER * CELL_SIZE // 2))
             self.screen.blit(players_text, players_rect)
             
             if self.game_can_start:
-                start_text = font.render("Click 'Start Game' para iniciar", True, (100, 255, 100))
+                start_text = assets.text(font, "Click 'Start Game' para iniciar", (100, 255, 100))
                 start_rect = start_text.get_rect(center=(CELL_NUMBER * CELL_SIZE // 2, CELL_NUMBER * CELL_SIZE // 2 + 50))
                 self.screen.blit(start_text, start_rect)
         
@@ -491,14 +366,13 @@ class MultiplayerGame:
 
     def draw_countdown(self):
         """Dibujar cuenta regresiva"""
-        countdown_text = self.game_font.render(str(self.countdown), True, (255, 255, 255))
+        countdown_text = assets.text(self.game_font, str(self.countdown), (255, 255, 255))
         countdown_rect = countdown_text.get_rect(center=(CELL_NUMBER * CELL_SIZE // 2, CELL_NUMBER * CELL_SIZE // 2))
         self.screen.blit(countdown_text, countdown_rect)
 
     def draw_game_over(self):
         """Dibujar pantalla de fin de juego"""
-        font_path = os.path.join(os.path.dirname(__file__), "..", "assets", "Font", "PoetsenOne-Regular.ttf")
-        font = pygame.font.Font(font_path, 50)
+        font = self.game_font
 
         if self.winner == 0:
             game_over_text = "It's a Tie!"
@@ -510,7 +384,7 @@ class MultiplayerGame:
             game_over_text = "Game Over"
             text_color = (255, 0, 0)
 
-        game_over_surface = font.render(game_over_text, True, text_color)
+        game_over_surface = assets.text(font, game_over_text, text_color)
         text_rect = game_over_surface.get_rect(center=(CELL_NUMBER * CELL_SIZE // 2, CELL_NUMBER * CELL_SIZE // 2 - 100))
         self.screen.blit(game_over_surface, text_rect)
 
@@ -520,6 +394,7 @@ class MultiplayerGame:
 
     def draw_score(self):
         """Dibujar puntuaciones para 5 jugadores"""
+        self.hud_rects = []  # Áreas dibujadas (para el renderizado por rectángulos sucios)
         if self.game_state != 'playing':
             return
             
@@ -543,15 +418,15 @@ class MultiplayerGame:
         for i in range(1, 6):
             if i in self.snakes and self.snakes[i] and len(self.snakes[i].body) >= 3:
                 score_text = str(len(self.snakes[i].body) - 3)
-                score_surface = self.game_font.render(score_text, True, (56, 74, 12))
+                score_surface = self.hud.label(('score', i), self.game_font, score_text, (56, 74, 12))
                 
                 # Cargar imagen de serpiente según jugador (usar p1 o p2 como fallback)
                 try:
                     player_img_num = min(i, 2)  # Usar imágenes de player1 o player2
-                    snake_image = pygame.transform.scale(getattr(self.fruit, f'p{player_img_num}'), (snake_size, snake_size))
+                    snake_image = self.hud.icon(getattr(self.fruit, f'p{player_img_num}'), (snake_size, snake_size))
                 except:
                     # Fallback si no hay imagen específica
-                    snake_image = pygame.transform.scale(self.fruit.p1, (snake_size, snake_size))
+                    snake_image = self.hud.icon(self.fruit.p1, (snake_size, snake_size))
                 
                 # Posicionar según alineación
                 if alignments[i-1] == 'midleft':
@@ -582,24 +457,15 @@ class MultiplayerGame:
                 self.screen.blit(score_surface, score_rect)
                 
                 # Dibujar nombre del jugador (opcional, más pequeño)
-                name_font = pygame.font.Font(None, 16)
-                name_surface = name_font.render(self.player_names[i], True, (56, 74, 12))
+                name_font = assets.font(None, 16)
+                name_surface = self.hud.label(('name', i), name_font, self.player_names[i], (56, 74, 12))
                 name_rect = name_surface.get_rect(midtop=(bg_rect.centerx, bg_rect.bottom + 1))
                 self.screen.blit(name_surface, name_rect)
+                self.hud_rects.append(bg_rect.union(name_rect))
 
     def draw_grass(self):
         """Dibujar fondo de césped"""
-        for row in range(CELL_NUMBER):
-            if row % 2 == 0:
-                for col in range(CELL_NUMBER):
-                    if col % 2 == 0:
-                        grass_rect = pygame.Rect(col * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                        pygame.draw.rect(self.screen, GRASS_COLOR, grass_rect)
-            else:
-                for col in range(CELL_NUMBER):
-                    if col % 2 != 0:
-                        grass_rect = pygame.Rect(col * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                        pygame.draw.rect(self.screen, GRASS_COLOR, grass_rect)
+        self.screen.blit(assets.grass(CELL_NUMBER, CELL_SIZE, GRASS_COLOR, GRASS_COLOR_ALT), (0, 0))
 
     def handle_input(self, event):
         """Manejar entrada del usuario"""
@@ -612,10 +478,9 @@ class MultiplayerGame:
         """Manejar clics del mouse"""
         if self.game_state == 'start' and self.is_host and self.game_can_start:
             if self.start_button.is_clicked(pos):
-                self.start_countdown()
-                # Notificar a todos que el juego inicia
+                # El servidor inicia la partida y avisa a todos (también a nosotros)
                 if self.client:
-                    self.client.send_game_state(self)
+                    self.client.request_game_start()
         elif self.game_state == 'game_over':
             if self.reset_button.is_clicked(pos):
                 self.reset_game()
@@ -637,82 +502,17 @@ class MultiplayerGame:
             return
             
         # El jugador local controla SU serpiente según su player_number
-        if self.player_number in self.snakes and self.snakes[self.player_number]:
-            snake = self.snakes[self.player_number]
-            
-            # Controles para el jugador local
-            if self.player_number == 1:  # WASD
-                if event.key == pygame.K_w and snake.direction.y != 1:
-                    snake.direction = Vector2(0, -1)
-                elif event.key == pygame.K_s and snake.direction.y != -1:
-                    snake.direction = Vector2(0, 1)
-                elif event.key == pygame.K_d and snake.direction.x != -1:
-                    snake.direction = Vector2(1, 0)
-                elif event.key == pygame.K_a and snake.direction.x != 1:
-                    snake.direction = Vector2(-1, 0)
-                    
-            elif self.player_number == 2:  # Flechas
-                if event.key == pygame.K_UP and snake.direction.y != 1:
-                    snake.direction = Vector2(0, -1)
-                elif event.key == pygame.K_DOWN and snake.direction.y != -1:
-                    snake.direction = Vector2(0, 1)
-                elif event.key == pygame.K_RIGHT and snake.direction.x != -1:
-                    snake.direction = Vector2(1, 0)
-                elif event.key == pygame.K_LEFT and snake.direction.x != 1:
-                    snake.direction = Vector2(-1, 0)
-                    
-            # Controles adicionales para jugadores 3-5
-            elif self.player_number == 3:  # IJKL
-                if event.key == pygame.K_i and snake.direction.y != 1:
-                    snake.direction = Vector2(0, -1)
-                elif event.key == pygame.K_k and snake.direction.y != -1:
-                    snake.direction = Vector2(0, 1)
-                elif event.key == pygame.K_l and snake.direction.x != -1:
-                    snake.direction = Vector2(1, 0)
-                elif event.key == pygame.K_j and snake.direction.x != 1:
-                    snake.direction = Vector2(-1, 0)
-                    
-            elif self.player_number == 4:  # Numpad 8456
-                if event.key == pygame.K_8 and snake.direction.y != 1:
-                    snake.direction = Vector2(0, -1)
-                elif event.key == pygame.K_5 and snake.direction.y != -1:
-                    snake.direction = Vector2(0, 1)
-                elif event.key == pygame.K_6 and snake.direction.x != -1:
-                    snake.direction = Vector2(1, 0)
-                elif event.key == pygame.K_4 and snake.direction.x != 1:
-                    snake.direction = Vector2(-1, 0)
-                    
-            elif self.player_number == 5:  # TFGH
-                if event.key == pygame.K_t and snake.direction.y != 1:
-                    snake.direction = Vector2(0, -1)
-                elif event.key == pygame.K_g and snake.direction.y != -1:
-                    snake.direction = Vector2(0, 1)
-                elif event.key == pygame.K_h and snake.direction.x != -1:
-                    snake.direction = Vector2(1, 0)
-                elif event.key == pygame.K_f and snake.direction.x != 1:
-                    snake.direction = Vector2(-1, 0)
+        input_str = PLAYER_KEYS.get(self.player_number, {}).get(event.key)
+        if input_str and self.player_number in self.snakes and self.snakes[self.player_number]:
+            if self.predictor is None:
+                self.simulation.apply_input(self.player_number, input_str)
             
             # Enviar input al servidor
             if self.client and self.client.connected:
-                input_str = self._get_input_string(event)
-                if input_str:
-                    self.client.send_input(input_str)
-
-    def _get_input_string(self, event):
-        """Convertir evento de tecla a string para red"""
-        key_mapping = {
-            # Jugador 1 (WASD)
-            pygame.K_w: 'up', pygame.K_s: 'down', pygame.K_a: 'left', pygame.K_d: 'right',
-            # Jugador 2 (Flechas)
-            pygame.K_UP: 'up', pygame.K_DOWN: 'down', pygame.K_LEFT: 'left', pygame.K_RIGHT: 'right',
-            # Jugador 3 (IJKL)
-            pygame.K_i: 'up', pygame.K_k: 'down', pygame.K_j: 'left', pygame.K_l: 'right',
-            # Jugador 4 (Numpad)
-            pygame.K_8: 'up', pygame.K_5: 'down', pygame.K_4: 'left', pygame.K_6: 'right',
-            # Jugador 5 (TFGH)
-            pygame.K_t: 'up', pygame.K_g: 'down', pygame.K_f: 'left', pygame.K_h: 'right'
-        }
-        return key_mapping.get(event.key)
+                seq = self.client.send_input(input_str)
+                # El cliente lo aplica en su próximo tick predicho y lo guarda para reconciliar
+                if self.predictor is not None and seq is not None:
+                    self.predictor.add_input(seq, input_str)
 
     def cleanup(self):
         """Limpiar recursos"""
@@ -3,32 +3,74 @@ import os
 import argparse
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import time
 import pygame
 from src.game import Game
 from src.game_multiplayer import MultiplayerGame
-from src.constants import GRASS_COLOR_ALT, MODE_MULTIPLAYER_HOST, MODE_MULTIPLAYER_CLIENT
+from src.constants import (GRASS_COLOR_ALT, MODE_MULTIPLAYER_HOST, MODE_MULTIPLAYER_CLIENT,
+                           DIRTY_RECT_RENDERING, TICK_RATE, FRAME_RATE, USE_UDP)
+from src.scheduler import TickScheduler
+from src.sprites.assets import assets, game_asset_paths
+from src.ui.renderer import DirtyRenderer
+
+def draw_frame(game):
+    """Draw the current screen of the game into the back buffer"""
+    game.screen.fill(GRASS_COLOR_ALT)
+    
+    if game.game_state == 'countdown':
+        game.draw_grass()
+        if hasattr(game, 'draw_countdown'):
+            game.draw_countdown()
+    else:
+        game.draw_elements()
+
+def wait_for_events(timeout):
+    """Block until an event arrives or timeout seconds pass, then return all queued events"""
+    timeout_ms = int(timeout * 1000)
+    if timeout_ms <= 0:
+        # pygame.event.wait(0) would block forever
+        return pygame.event.get()
+    event = pygame.event.wait(timeout_ms)
+    events = [event] if event.type != pygame.NOEVENT else []
+    return events + pygame.event.get()
 
 def run_game(game_mode="two_player", p1_name="Player 1", p2_name="Player 2", 
-             sound="on", music="on", host=None, port=5555, is_host=True):
+             sound="on", music="on", host=None, port=5555, is_host=True, tick_rate=TICK_RATE,
+             udp=USE_UDP, room=None):
     """Run a single game session and return when complete"""
     # Initialize pygame
     pygame.mixer.pre_init(44100, 16, 2, 512)
     pygame.init()
     pygame.display.init()
     
+    # Decode sprites and sounds in the background while the game (and its
+    # network connection) is being set up; sounds from an earlier session
+    # belong to a mixer that has been shut down
+    assets.clear()
+    images, sounds = game_asset_paths()
+    assets.preload(images, sounds)
+    
     # Create appropriate game instance
     if game_mode in [MODE_MULTIPLAYER_HOST, MODE_MULTIPLAYER_CLIENT]:
         print(f"🎮 Iniciando juego multijugador: {'HOST' if is_host else 'CLIENTE'}")
         print(f"🔗 Conectando a: {host}:{port}")
-        game = MultiplayerGame(game_mode, p1_name, p2_name, sound, music, host, port, is_host)
+        game = MultiplayerGame(game_mode, p1_name, p2_name, sound, music, host, port, is_host, udp, room,
+                               tick_rate)
     else:
         print(f"🎮 Iniciando juego local: {game_mode}")
         game = Game(game_mode, p1_name, p2_name, sound, music)
     
+    renderer = DirtyRenderer() if DIRTY_RECT_RENDERING else None
+    
+    # The simulation steps on a fixed timestep, independent of how often we draw
+    scheduler = TickScheduler(tick_rate)
+    networked = hasattr(game, 'handle_network_messages')
+    timeout = 0
+    
     # Game loop
     while True:
-        # Event handling
-        for event in pygame.event.get():
+        # Event handling (sleeps here until input arrives or the next tick is due)
+        for event in wait_for_events(timeout):
             if event.type == pygame.QUIT:
                 # Clean up before returning
                 if hasattr(game, 'cleanup'):
@@ -39,33 +81,46 @@ def run_game(game_mode="two_player", p1_name="Player 1", p2_name="Player 2",
                 pygame.quit()
                 return "QUIT"
                 
-            if event.type == game.SCREEN_UPDATE:
-                if game.game_state == 'playing':
-                    game.update()
-                    
             # Handle other inputs
             game.handle_input(event)
+            if renderer:
+                renderer.handle_event(event)
             
         # Handle network messages for multiplayer (outside event loop for better performance)
         if hasattr(game, 'handle_network_messages'):
             game.handle_network_messages()
+            # Predict at the rate the server announced, not our own --tick-rate
+            if game.tick_rate != tick_rate:
+                tick_rate = game.tick_rate
+                scheduler.set_tick_rate(tick_rate)
+                
+        # Run the simulation ticks that are due; outside play keep the
+        # schedule anchored to now so the first tick is not a catch-up burst
+        now = time.perf_counter()
+        if game.game_state == 'playing':
+            for _ in range(scheduler.advance(now)):
+                if game.game_state != 'playing':
+                    break
+                game.update()
+        else:
+            scheduler.reset(now)
                 
         # Update during countdown and connecting states
         if game.game_state in ['countdown', 'connecting']:
             game.update()
             
         # Drawing
-        game.screen.fill(GRASS_COLOR_ALT)
-        
-        if game.game_state == 'countdown':
-            game.draw_grass()
-            if hasattr(game, 'draw_countdown'):
-                game.draw_countdown()
+        if renderer:
+            renderer.render(game, draw_frame)
         else:
-            game.draw_elements()
-            
-        pygame.display.update()
-        game.clock.tick(60)  # Limit to 60 frames per second
+            draw_frame(game)
+            pygame.display.update()
+        
+        # A local match only changes on input or on the next tick; network
+        # games, countdowns and menus are polled at most FRAME_RATE times per second
+        timeout = scheduler.time_until_next()
+        if networked or game.game_state != 'playing':
+            timeout = min(timeout, 1.0 / FRAME_RATE)
         
         # Check for menu return
         if getattr(game, 'game_state', None) == "MENU":
@@ -91,6 +146,10 @@ def parse_arguments():
     parser.add_argument('--host', help='Server host address')
     parser.add_argument('--port', type=int, default=5555, help='Server port')
     parser.add_argument('--is-host', type=int, default=1, help='Is host (1) or client (0)')
+    parser.add_argument('--tick-rate', type=float, default=TICK_RATE, help='Simulation ticks per second')
+    parser.add_argument('--udp', action='store_true', default=USE_UDP,
+                        help='Send game states and inputs over UDP (lobby stays on TCP)')
+    parser.add_argument('--room', help='Room to create or join on a server started with --rooms')
     
     return parser.parse_args()
 
@@ -114,7 +173,10 @@ def main():
             music=args.music,
             host=host,
             port=port,
-            is_host=is_host
+            is_host=is_host,
+            tick_rate=args.tick_rate,
+            udp=args.udp,
+            room=args.room
         )
         
         # After game ends, check result
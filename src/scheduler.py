@@ -0,0 +1,110 @@
+import math
+import threading
+import time
+from src.constants import TICK_RATE, MAX_CATCH_UP_TICKS, TIMER_WHEEL_RESOLUTION, TIMER_WHEEL_SLOTS
+
+# Fixed-timestep clock shared by the pygame loop and the dedicated server.
+# No pygame in here: it only decides when simulation ticks are due.
+
+
+class TickScheduler:
+    """
+    Accumulator-based fixed timestep.
+
+    advance(now) returns how many ticks are due since the last call, so the
+    simulation runs at exactly tick_rate on average no matter how long each
+    frame took. After a stall (window drag, debugger, slow machine) at most
+    max_catch_up ticks are run and the rest of the backlog is dropped instead
+    of fast-forwarding the game.
+    """
+
+    def __init__(self, tick_rate=TICK_RATE, max_catch_up=MAX_CATCH_UP_TICKS, clock=time.perf_counter):
+        self.interval = 1.0 / tick_rate
+        self.max_catch_up = max_catch_up
+        self.clock = clock
+        self.reset()
+
+    def reset(self, now=None):
+        """Start counting from now (e.g. when the game starts or resumes)"""
+        self.next_tick = self.clock() if now is None else now
+        self.next_tick += self.interval
+
+    def advance(self, now=None):
+        """Number of ticks to run now"""
+        now = self.clock() if now is None else now
+        if now < self.next_tick:
+            return 0
+        due = int((now - self.next_tick) / self.interval) + 1
+        if due > self.max_catch_up:
+            # Too far behind: run a few ticks and restart the schedule from now
+            self.next_tick = now + self.interval
+            return self.max_catch_up
+        self.next_tick += due * self.interval
+        return due
+
+    def set_tick_rate(self, tick_rate):
+        """Change the rate (e.g. to the one a game server announced) from the next tick on"""
+        self.interval = 1.0 / tick_rate
+
+    def time_until_next(self, now=None):
+        """Seconds left before the next tick is due (0 if it is already late)"""
+        now = self.clock() if now is None else now
+        return max(0.0, self.next_tick - now)
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel: one thread fires the timers of many rooms.
+
+    Time is cut into slots of `resolution` seconds. A timer due at t goes to
+    the first slot starting at or after t, modulo the wheel size, tagged with its absolute
+    slot so timers more than one turn away wait for their lap. advance(now)
+    only visits the slots that elapsed since the last call, so its cost
+    depends on the timers that are due, not on how many are pending.
+    Callbacks run outside the lock and may schedule new timers.
+    """
+
+    def __init__(self, resolution=TIMER_WHEEL_RESOLUTION, slots=TIMER_WHEEL_SLOTS, clock=time.monotonic):
+        self.resolution = resolution
+        self.clock = clock
+        self._slots = [[] for _ in range(slots)]
+        self._current = int(clock() / resolution)  # Last absolute slot already fired
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._pending
+
+    def schedule(self, deadline, callback, *args):
+        """Run callback(*args) once the wheel is advanced past deadline (clock time)"""
+        with self._lock:
+            slot = max(math.ceil(deadline / self.resolution), self._current + 1)
+            self._slots[slot % len(self._slots)].append((slot, deadline, callback, args))
+            self._pending += 1
+
+    def advance(self, now=None):
+        """Fire every timer due by now, earliest first; returns how many fired"""
+        now = self.clock() if now is None else now
+        target = int(now / self.resolution)
+        due = []
+        with self._lock:
+            # After a stall longer than a turn, every slot is visited once
+            last = min(target, self._current + len(self._slots))
+            for absolute in range(self._current + 1, last + 1):
+                index = absolute % len(self._slots)
+                bucket = self._slots[index]
+                if bucket:
+                    due.extend(entry for entry in bucket if entry[0] <= target)
+                    self._slots[index] = [entry for entry in bucket if entry[0] > target]
+            self._current = max(self._current, target)
+            self._pending -= len(due)
+
+        due.sort(key=lambda entry: entry[1])
+        for _, _, callback, args in due:
+            callback(*args)
+        return len(due)
+
+    def time_until_next(self, now=None):
+        """Seconds until the next slot starts"""
+        now = self.clock() if now is None else now
+        return max(0.0, (self._current + 1) * self.resolution - now)
@@ -0,0 +1,116 @@
+import sys
+import os
+import argparse
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.constants import DEFAULT_PORT, TICK_RATE, MAX_PLAYERS, SERVER_ENGINE, USE_UDP
+from src.scheduler import TickScheduler
+from src.services.match import Match
+from src.services.network import RoomManager, create_server
+from src.simulation import START_POSITIONS
+
+
+class DedicatedServer:
+    """
+    Servidor dedicado sin pygame (sin ventana, audio, fuentes ni menú)
+    Ejecuta la simulación en su propio bucle de ticks y difunde el estado a los clientes
+    Con rooms > 0 aloja hasta ese número de partidas independientes (salas)
+    Por defecto no acepta el codec pickle: solo clientes que negocien el protocolo binario
+    """
+
+    def __init__(self, host='0.0.0.0', port=DEFAULT_PORT, tick_rate=TICK_RATE,
+                 max_players=MAX_PLAYERS, min_players=2, engine=SERVER_ENGINE, udp=USE_UDP, rooms=0,
+                 allow_pickle=False):
+        self.min_players = min_players
+        # Con salas, max_players es el tope de cada sala; el lobby admite a todos
+        lobby_size = max_players * rooms if rooms else max_players
+        self.server = create_server(host=host, port=port, engine=engine, max_players=lobby_size, udp=udp,
+                                    allow_pickle=allow_pickle)
+        # Con salas, cada una lleva su partida y su ritmo; sin ellas, una sola partida
+        self.scheduler = None
+        self.match = None
+        self.rooms = None
+        self.running = False
+
+        if rooms:
+            self.rooms = RoomManager(self.server, max_rooms=rooms, tick_rate=tick_rate,
+                                     min_players=min_players, max_players=max_players)
+        else:
+            self.scheduler = TickScheduler(tick_rate, clock=time.monotonic)
+            self.match = Match()
+            # Los inputs y nombres de los clientes van a la partida del servidor
+            self.server.attach_match(self.match, tick_rate=tick_rate)
+
+    def run(self):
+        """Bucle principal: paso fijo de simulación, durmiendo hasta el siguiente tick"""
+        if not self.server.start_server():
+            return False
+        self.running = True
+        try:
+            if self.rooms:
+                print(f"🏠 Hasta {self.rooms.max_rooms} salas, tick cada {1000 / self.rooms.tick_rate:.0f} ms, "
+                      f"mínimo {self.min_players} jugadores")
+                self.rooms.run()
+                return True
+            print(f"⏱️ Tick cada {self.scheduler.interval * 1000:.0f} ms, mínimo {self.min_players} jugadores")
+            self.scheduler.reset()
+            while self.running:
+                now = time.monotonic()
+                for _ in range(self.scheduler.advance(now)):
+                    self.tick(now)
+                time.sleep(self.scheduler.time_until_next())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.rooms:
+                self.rooms.stop()
+            self.server.stop_server()
+        return True
+
+    def tick(self, now):
+        """Avanzar lobby o partida y enviar el estado si hay partida en curso"""
+        previous_state = self.server.auto_step_match(now, self.min_players)
+        if self.match.game_state == 'game_over' and previous_state not in (None, 'game_over'):
+            print(f"🏁 Fin de la partida, ganador: {self.match.winner}")
+
+    def stop(self):
+        self.running = False
+        if self.rooms:
+            self.rooms.stop()
+
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Snake dedicated server')
+    parser.add_argument('--host', default='0.0.0.0', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Server port')
+    parser.add_argument('--tick-rate', type=float, default=TICK_RATE,
+                        help='Simulation ticks per second')
+    parser.add_argument('--max-players', type=int, default=MAX_PLAYERS,
+                        choices=range(2, len(START_POSITIONS) + 1), help='Player cap')
+    parser.add_argument('--min-players', type=int, default=2,
+                        help='Players needed to start a match')
+    parser.add_argument('--engine', choices=['asyncio', 'threaded'], default=SERVER_ENGINE,
+                        help='Network engine')
+    parser.add_argument('--udp', action='store_true', default=USE_UDP,
+                        help='Offer a UDP channel for game states and inputs')
+    parser.add_argument('--rooms', type=int, default=0,
+                        help='Host up to this many independent matches (rooms); 0 runs a single match')
+    parser.add_argument('--allow-pickle', action='store_true',
+                        help='Also accept clients using the legacy pickle codec (protocol 1.0)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    server = DedicatedServer(host=args.host, port=args.port, tick_rate=args.tick_rate,
+                             max_players=args.max_players,
+                             min_players=min(args.min_players, args.max_players),
+                             engine=args.engine, udp=args.udp, rooms=args.rooms,
+                             allow_pickle=args.allow_pickle)
+    if not server.run():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
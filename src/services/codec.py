@@ -0,0 +1,499 @@
+"""
+Codecs de red para los mensajes de GameProtocol
+
+Cada payload empieza con un byte que identifica el codec que lo generó,
+así el receptor puede decodificar cualquier mensaje aunque la negociación
+de versión todavía no haya terminado.
+"""
+import pickle
+import struct
+from itertools import chain
+
+
+class PickleCodec:
+    """Codec original (protocolo 1.0): el diccionario del mensaje serializado con pickle"""
+
+    codec_id = 0
+    version = "1.0"
+
+    def encode(self, message):
+        return pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def decode(self, data):
+        return pickle.loads(data)
+
+
+class BinaryCodec:
+    """
+    Codec binario compacto (protocolo 2.0)
+    Tipo de mensaje como entero, tick monotónico de 32 bits y coordenadas
+    de la cuadrícula empaquetadas con struct (un byte por coordenada)
+    """
+
+    codec_id = 1
+    version = "2.0"
+
+    # El orden define el identificador en la red: solo añadir al final
+    MESSAGE_TYPES = (
+        'assign_player', 'connected_players', 'player_joined', 'game_can_start',
+        'game_start', 'player_input', 'game_state', 'game_state_update', 'game_over',
+        'player_disconnected', 'player_name', 'player_name_update', 'error',
+        'hello', 'version_ack', 'game_state_delta',
+        'udp_request', 'udp_token', 'udp_hello', 'player_inputs',
+        'list_rooms', 'room_list', 'create_room', 'join_room', 'room_joined',
+    )
+
+    # Campos de cada mensaje (además de 'type' y 'tick')
+    MESSAGE_FIELDS = {
+        'assign_player': (('player_number', 'player'),),
+        'connected_players': (('count', 'u8'), ('capacity', 'opt_u32')),
+        'player_joined': (('player_number', 'player'),),
+        'game_can_start': (),
+        'game_start': (('tick_rate', 'opt_f32'),),
+        'player_input': (('player_number', 'player'), ('input', 'input'), ('seq', 'opt_u32')),
+        'game_state': (('state', 'state'), ('sim_tick', 'opt_u32'), ('acks', 'acks')),
+        'game_state_update': (('state', 'state'), ('sim_tick', 'opt_u32'), ('acks', 'acks')),
+        'game_over': (('winner', 'player'), ('scores', 'scores')),
+        'player_disconnected': (('player_number', 'player'),),
+        'player_name': (('player_number', 'player'), ('name', 'str')),
+        'player_name_update': (('player_number', 'player'), ('name', 'str')),
+        'error': (('message', 'str'),),
+        'hello': (('versions', 'versions'),),
+        'version_ack': (('version', 'str'),),
+        'game_state_delta': (('snapshot_id', 'u32'), ('baseline_id', 'u32'), ('delta', 'delta'),
+                             ('sim_tick', 'opt_u32'), ('acks', 'acks')),
+        'udp_request': (),
+        'udp_token': (('token', 'u32'),),
+        'udp_hello': (('player_number', 'player'), ('token', 'u32')),
+        'player_inputs': (('player_number', 'player'), ('inputs', 'inputs')),
+        'list_rooms': (),
+        'room_list': (('rooms', 'rooms'),),
+        'create_room': (('name', 'str'), ('max_players', 'u8')),
+        'join_room': (('room_id', 'u32'),),
+        'room_joined': (('room_id', 'u32'), ('name', 'str')),
+    }
+    # Los campos opt_u32, opt_f32 y acks van siempre al final: un decodificador anterior
+    # ignora los bytes sobrantes y uno nuevo los da por ausentes si no llegan
+
+    # Cadenas frecuentes que se envían como un solo byte
+    SYMBOLS = (
+        'connecting', 'connection_failed', 'start', 'countdown', 'playing', 'game_over', 'MENU',
+        'single_player', 'two_player', 'multiplayer', 'multiplayer_host', 'multiplayer_client',
+    )
+
+    INPUTS = ('up', 'down', 'left', 'right')
+
+    NONE = 0xFF  # Valor reservado para None en campos de un byte
+
+    # Bits de los campos opcionales de un delta
+    DELTA_FRUIT = 0x01
+    DELTA_MINE = 0x02
+    DELTA_PLAYERS = 0x04
+
+    # Bits de las operaciones de una serpiente en un delta
+    OP_BODY = 0x01
+    OP_PUSH = 0x02
+    OP_POP = 0x04
+    OP_DIRECTION = 0x08
+    OP_NEW_BLOCK = 0x10
+
+    HEADER = struct.Struct('!BI')
+    SNAKE_HEADER = struct.Struct('!BbbBH')
+    POINT = struct.Struct('!bb')
+    ACK = struct.Struct('!BII')
+
+    def __init__(self):
+        self._type_ids = {name: index for index, name in enumerate(self.MESSAGE_TYPES)}
+        self._symbol_ids = {name: index for index, name in enumerate(self.SYMBOLS)}
+        self._input_ids = {name: index for index, name in enumerate(self.INPUTS)}
+
+    # Codificación
+
+    def encode(self, message):
+        msg_type = message['type']
+        out = bytearray(self.HEADER.pack(self._type_ids[msg_type], message.get('tick', 0) & 0xFFFFFFFF))
+        for field, kind in self.MESSAGE_FIELDS[msg_type]:
+            getattr(self, f'_write_{kind}')(out, message.get(field))
+        return bytes(out)
+
+    def _write_u8(self, out, value):
+        out.append(value)
+
+    def _write_u32(self, out, value):
+        out += struct.pack('!I', value or 0)
+
+    def _write_opt_u32(self, out, value):
+        if value is None:
+            out.append(0)
+        else:
+            out.append(1)
+            out += struct.pack('!I', value)
+
+    def _write_opt_f32(self, out, value):
+        if value is None:
+            out.append(0)
+        else:
+            out.append(1)
+            out += struct.pack('!f', value)
+
+    def _write_acks(self, out, value):
+        value = value or {}
+        out.append(len(value))
+        for player_num, (seq, tick) in value.items():
+            out += self.ACK.pack(int(player_num), seq, tick)
+
+    def _write_inputs(self, out, value):
+        value = value or ()
+        out.append(len(value))
+        for seq, input_name in value:
+            out += struct.pack('!I', seq)
+            self._write_input(out, input_name)
+
+    def _write_player(self, out, value):
+        out.append(self.NONE if value is None else value)
+
+    def _write_input(self, out, value):
+        out.append(self._input_ids.get(value, self.NONE))
+
+    def _write_str(self, out, value):
+        data = (value or '').encode('utf-8')
+        out += struct.pack('!H', len(data))
+        out += data
+
+    def _write_symbol(self, out, value):
+        symbol_id = self._symbol_ids.get(value)
+        if symbol_id is None:
+            out.append(self.NONE)
+            self._write_str(out, value)
+        else:
+            out.append(symbol_id)
+
+    def _write_versions(self, out, value):
+        out.append(len(value))
+        for version in value:
+            self._write_str(out, version)
+
+    def _write_scores(self, out, value):
+        value = value or {}
+        out.append(len(value))
+        for player_num, score in value.items():
+            out += struct.pack('!Bh', int(player_num), score)
+
+    def _write_names(self, out, value):
+        value = value or {}
+        out.append(len(value))
+        for player_num, name in value.items():
+            out.append(int(player_num))
+            self._write_str(out, name)
+
+    def _write_rooms(self, out, value):
+        value = value or ()
+        out += struct.pack('!H', len(value))
+        for room in value:
+            out += struct.pack('!I', room['room_id'])
+            self._write_str(out, room['name'])
+            out.append(room['players'])
+            out.append(room['max_players'])
+            self._write_symbol(out, room['game_state'])
+
+    def _write_point(self, out, point):
+        if point is None:
+            out.append(0)
+        else:
+            out.append(1)
+            out += self.POINT.pack(int(point['x']), int(point['y']))
+
+    def _write_state(self, out, state):
+        if state is None:
+            out.append(0)
+            return
+        out.append(1)
+        self._write_u32(out, state.get('snapshot_id'))
+        self._write_symbol(out, state.get('game_state'))
+        self._write_symbol(out, state.get('game_mode'))
+        out += struct.pack('!b', state.get('countdown') or 0)
+        self._write_player(out, state.get('winner'))
+
+        snakes = state.get('snakes', {})
+        out.append(len(snakes))
+        for player_num, snake in snakes.items():
+            self._write_snake(out, player_num, snake)
+
+        self._write_point(out, state.get('fruit'))
+        self._write_point(out, state.get('mine'))
+        self._write_names(out, state.get('players'))
+
+    def _write_snake(self, out, player_num, snake):
+        body = snake['body']
+        direction = snake['direction']
+        out += self.SNAKE_HEADER.pack(player_num, int(direction['x']), int(direction['y']),
+                                      bool(snake.get('new_block')), len(body))
+        self._write_points(out, body)
+
+    def _write_points(self, out, points):
+        out += struct.pack(f'!{2 * len(points)}b', *chain.from_iterable(points))
+
+    def _write_delta(self, out, delta):
+        self._write_symbol(out, delta['game_state'])
+        out += struct.pack('!b', delta['countdown'] or 0)
+        self._write_player(out, delta['winner'])
+
+        flags = ((self.DELTA_FRUIT if 'fruit' in delta else 0)
+                 | (self.DELTA_MINE if 'mine' in delta else 0)
+                 | (self.DELTA_PLAYERS if 'players' in delta else 0))
+        out.append(flags)
+        if 'fruit' in delta:
+            self._write_point(out, delta['fruit'])
+        if 'mine' in delta:
+            self._write_point(out, delta['mine'])
+        if 'players' in delta:
+            self._write_names(out, delta['players'])
+
+        out.append(len(delta['snakes']))
+        for player_num, ops in delta['snakes'].items():
+            self._write_snake_ops(out, player_num, ops)
+
+    def _write_snake_ops(self, out, player_num, ops):
+        flags = ((self.OP_BODY if 'body' in ops else 0)
+                 | (self.OP_PUSH if 'push' in ops else 0)
+                 | (self.OP_POP if 'pop' in ops else 0)
+                 | (self.OP_DIRECTION if 'direction' in ops else 0)
+                 | (self.OP_NEW_BLOCK if ops.get('new_block') else 0))
+        out.append(player_num)
+        out.append(flags)
+        if 'body' in ops:
+            out += struct.pack('!H', len(ops['body']))
+            self._write_points(out, ops['body'])
+        if 'push' in ops:
+            out.append(len(ops['push']))
+            self._write_points(out, ops['push'])
+        if 'pop' in ops:
+            out += struct.pack('!H', ops['pop'])
+        if 'direction' in ops:
+            out += self.POINT.pack(int(ops['direction']['x']), int(ops['direction']['y']))
+
+    # Decodificación
+
+    def decode(self, data):
+        type_id, tick = self.HEADER.unpack_from(data, 0)
+        msg_type = self.MESSAGE_TYPES[type_id]
+        message = {'type': msg_type, 'tick': tick}
+        offset = self.HEADER.size
+        for field, kind in self.MESSAGE_FIELDS[msg_type]:
+            message[field], offset = getattr(self, f'_read_{kind}')(data, offset)
+        return message
+
+    def _read_u8(self, data, offset):
+        return data[offset], offset + 1
+
+    def _read_u32(self, data, offset):
+        return struct.unpack_from('!I', data, offset)[0], offset + 4
+
+    def _read_opt_u32(self, data, offset):
+        if offset >= len(data) or not data[offset]:
+            return None, offset + 1
+        return struct.unpack_from('!I', data, offset + 1)[0], offset + 5
+
+    def _read_opt_f32(self, data, offset):
+        if offset >= len(data) or not data[offset]:
+            return None, offset + 1
+        return struct.unpack_from('!f', data, offset + 1)[0], offset + 5
+
+    def _read_acks(self, data, offset):
+        if offset >= len(data):
+            return {}, offset
+        count = data[offset]
+        offset += 1
+        acks = {}
+        for _ in range(count):
+            player_num, seq, tick = self.ACK.unpack_from(data, offset)
+            acks[player_num] = (seq, tick)
+            offset += self.ACK.size
+        return acks, offset
+
+    def _read_inputs(self, data, offset):
+        count = data[offset]
+        offset += 1
+        inputs = []
+        for _ in range(count):
+            (seq,) = struct.unpack_from('!I', data, offset)
+            input_name, offset = self._read_input(data, offset + 4)
+            inputs.append((seq, input_name))
+        return inputs, offset
+
+    def _read_player(self, data, offset):
+        value = data[offset]
+        return (None if value == self.NONE else value), offset + 1
+
+    def _read_input(self, data, offset):
+        value = data[offset]
+        return (None if value == self.NONE else self.INPUTS[value]), offset + 1
+
+    def _read_str(self, data, offset):
+        (length,) = struct.unpack_from('!H', data, offset)
+        offset += 2
+        return bytes(data[offset:offset + length]).decode('utf-8'), offset + length
+
+    def _read_symbol(self, data, offset):
+        symbol_id = data[offset]
+        if symbol_id == self.NONE:
+            return self._read_str(data, offset + 1)
+        return self.SYMBOLS[symbol_id], offset + 1
+
+    def _read_versions(self, data, offset):
+        count = data[offset]
+        offset += 1
+        versions = []
+        for _ in range(count):
+            version, offset = self._read_str(data, offset)
+            versions.append(version)
+        return versions, offset
+
+    def _read_scores(self, data, offset):
+        count = data[offset]
+        offset += 1
+        scores = {}
+        for _ in range(count):
+            player_num, score = struct.unpack_from('!Bh', data, offset)
+            scores[player_num] = score
+            offset += 3
+        return scores, offset
+
+    def _read_names(self, data, offset):
+        count = data[offset]
+        offset += 1
+        names = {}
+        for _ in range(count):
+            player_num = data[offset]
+            names[player_num], offset = self._read_str(data, offset + 1)
+        return names, offset
+
+    def _read_rooms(self, data, offset):
+        (count,) = struct.unpack_from('!H', data, offset)
+        offset += 2
+        rooms = []
+        for _ in range(count):
+            (room_id,) = struct.unpack_from('!I', data, offset)
+            name, offset = self._read_str(data, offset + 4)
+            players, max_players = data[offset], data[offset + 1]
+            game_state, offset = self._read_symbol(data, offset + 2)
+            rooms.append({'room_id': room_id, 'name': name, 'players': players,
+                          'max_players': max_players, 'game_state': game_state})
+        return rooms, offset
+
+    def _read_point(self, data, offset):
+        if not data[offset]:
+            return None, offset + 1
+        x, y = self.POINT.unpack_from(data, offset + 1)
+        return {'pos': {'x': x, 'y': y}, 'x': x, 'y': y}, offset + 1 + self.POINT.size
+
+    def _read_state(self, data, offset):
+        if not data[offset]:
+            return None, offset + 1
+        state = {}
+        state['snapshot_id'], offset = self._read_u32(data, offset + 1)
+        state['game_state'], offset = self._read_symbol(data, offset)
+        state['game_mode'], offset = self._read_symbol(data, offset)
+        (state['countdown'],) = struct.unpack_from('!b', data, offset)
+        state['winner'], offset = self._read_player(data, offset + 1)
+
+        count = data[offset]
+        offset += 1
+        state['snakes'] = {}
+        state['scores'] = {}
+        for _ in range(count):
+            player_num, snake, offset = self._read_snake(data, offset)
+            state['snakes'][player_num] = snake
+            state['scores'][player_num] = len(snake['body']) - 3
+
+        fruit, offset = self._read_point(data, offset)
+        if fruit:
+            state['fruit'] = fruit
+        mine, offset = self._read_point(data, offset)
+        if mine:
+            state['mine'] = mine
+        state['players'], offset = self._read_names(data, offset)
+        return state, offset
+
+    def _read_snake(self, data, offset):
+        player_num, dx, dy, new_block, length = self.SNAKE_HEADER.unpack_from(data, offset)
+        offset += self.SNAKE_HEADER.size
+        body, offset = self._read_points(data, offset, length)
+        snake = {
+            'body': body,
+            'direction': {'x': dx, 'y': dy},
+            'new_block': bool(new_block)
+        }
+        return player_num, snake, offset
+
+    def _read_points(self, data, offset, count):
+        coords = struct.unpack_from(f'!{2 * count}b', data, offset)
+        return list(zip(coords[::2], coords[1::2])), offset + 2 * count
+
+    def _read_delta(self, data, offset):
+        delta = {}
+        delta['game_state'], offset = self._read_symbol(data, offset)
+        (delta['countdown'],) = struct.unpack_from('!b', data, offset)
+        delta['winner'], offset = self._read_player(data, offset + 1)
+
+        flags = data[offset]
+        offset += 1
+        if flags & self.DELTA_FRUIT:
+            delta['fruit'], offset = self._read_point(data, offset)
+        if flags & self.DELTA_MINE:
+            delta['mine'], offset = self._read_point(data, offset)
+        if flags & self.DELTA_PLAYERS:
+            delta['players'], offset = self._read_names(data, offset)
+
+        count = data[offset]
+        offset += 1
+        delta['snakes'] = {}
+        for _ in range(count):
+            player_num, ops, offset = self._read_snake_ops(data, offset)
+            delta['snakes'][player_num] = ops
+        return delta, offset
+
+    def _read_snake_ops(self, data, offset):
+        player_num, flags = data[offset], data[offset + 1]
+        offset += 2
+        ops = {}
+        if flags & self.OP_BODY:
+            (length,) = struct.unpack_from('!H', data, offset)
+            ops['body'], offset = self._read_points(data, offset + 2, length)
+        if flags & self.OP_PUSH:
+            ops['push'], offset = self._read_points(data, offset + 1, data[offset])
+        if flags & self.OP_POP:
+            (ops['pop'],) = struct.unpack_from('!H', data, offset)
+            offset += 2
+        if flags & self.OP_DIRECTION:
+            x, y = self.POINT.unpack_from(data, offset)
+            ops['direction'] = {'x': x, 'y': y}
+            offset += self.POINT.size
+        ops['new_block'] = bool(flags & self.OP_NEW_BLOCK)
+        return player_num, ops, offset
+
+
+PICKLE_CODEC = PickleCodec()
+BINARY_CODEC = BinaryCodec()
+
+CODECS = {codec.codec_id: codec for codec in (PICKLE_CODEC, BINARY_CODEC)}
+CODECS_BY_VERSION = {codec.version: codec for codec in CODECS.values()}
+# Sin pickle: lo único que aceptan los servidores que desactivan el formato 1.0
+BINARY_CODECS = {BINARY_CODEC.codec_id: BINARY_CODEC}
+
+
+def encode_payload(message, codec=PICKLE_CODEC):
+    """Codificar un mensaje anteponiendo el identificador del codec"""
+    return bytes((codec.codec_id,)) + codec.encode(message)
+
+
+def decode_payload(data, codecs=CODECS):
+    """
+    Decodificar un payload con el codec indicado en su primer byte
+    Solo se aceptan los codecs de 'codecs': un payload pickle de un extremo
+    que no lo negoció se rechaza antes de deserializarlo
+    """
+    codec = codecs.get(data[0])
+    if codec is None:
+        raise ValueError(f"Codec no permitido: {data[0]}")
+    return codec.decode(data[1:])
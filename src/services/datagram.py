@@ -0,0 +1,245 @@
+"""
+Canal UDP opcional para estados del juego e inputs
+
+La conexión TCP sigue llevando el lobby y los mensajes de control; por UDP
+solo viajan estados completos (servidor -> cliente) e inputs (cliente ->
+servidor), así un paquete perdido no retrasa los ticks siguientes.
+
+- Los datagramas se codifican siempre con el codec binario (nunca pickle)
+  y sin cabecera de longitud: un mensaje por datagrama, hasta
+  UDP_MAX_DATAGRAM bytes. Lo que no cabe se envía por TCP.
+- Cada datagrama lleva el tick del mensaje como número de secuencia; el
+  receptor descarta los estados viejos por su snapshot_id y los inputs
+  repetidos por su seq.
+- Cada datagrama de inputs repite los últimos inputs sin confirmar, así
+  perder uno no pierde la pulsación.
+- El cliente se identifica con un token recibido por TCP (udp_token) y lo
+  envía en 'udp_hello' hasta que el servidor responde.
+"""
+import random
+import socket
+import threading
+from src.constants import UDP_MAX_DATAGRAM, INPUT_REDUNDANCY, UDP_HELLO_INTERVAL
+from src.services.codec import BINARY_CODEC, decode_payload, encode_payload
+
+
+def encode_datagram(message, max_size=UDP_MAX_DATAGRAM):
+    """Codificar un mensaje para UDP; devuelve None si no cabe en un datagrama"""
+    payload = encode_payload(message, BINARY_CODEC)
+    return payload if len(payload) <= max_size else None
+
+
+def decode_datagram(data):
+    """Decodificar un datagrama; devuelve None si no es un mensaje binario válido"""
+    if not data or data[0] != BINARY_CODEC.codec_id:
+        return None
+    try:
+        return decode_payload(data)
+    except Exception:
+        return None
+
+
+class DatagramServer:
+    """
+    Extremo UDP del servidor, en el mismo puerto que el TCP
+    Asocia cada dirección UDP al ClientHandler que presentó su token
+    """
+
+    def __init__(self, server, host='0.0.0.0', port=5555):
+        self.server = server
+        self.host = host
+        self.port = port
+        self.socket = None
+        self.running = False
+        self._tokens = {}  # token -> ClientHandler
+        self._clients = {}  # dirección UDP -> ClientHandler
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Abrir el socket UDP; devuelve False si no se pudo (el juego sigue solo por TCP)"""
+        try:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.bind((self.host, self.port))
+        except OSError as e:
+            print(f"⚠️ Canal UDP no disponible: {e}")
+            return False
+        self.running = True
+        receive_thread = threading.Thread(target=self._receive_loop)
+        receive_thread.daemon = True
+        receive_thread.start()
+        print(f"📡 Canal UDP en {self.host}:{self.port}")
+        return True
+
+    def register(self, client):
+        """Crear el token con el que el cliente abrirá su canal UDP"""
+        token = random.SystemRandom().getrandbits(32)
+        with self._lock:
+            self._tokens[token] = client
+        return token
+
+    def unregister(self, client):
+        with self._lock:
+            self._tokens = {token: c for token, c in self._tokens.items() if c is not client}
+            self._clients = {address: c for address, c in self._clients.items() if c is not client}
+        client.udp_address = None
+
+    def send(self, client, datagram):
+        """Enviar un datagrama ya codificado; devuelve False si no se pudo"""
+        address = client.udp_address
+        if not self.running or address is None or datagram is None:
+            return False
+        try:
+            self.socket.sendto(datagram, address)
+            return True
+        except OSError:
+            return False
+
+    def _receive_loop(self):
+        while self.running:
+            try:
+                data, address = self.socket.recvfrom(65535)
+            except OSError:
+                break
+            message = decode_datagram(data)
+            if message is None:
+                continue
+
+            if message['type'] == self.server.protocol.MSG_UDP_HELLO:
+                self._handle_hello(message, address)
+                continue
+
+            with self._lock:
+                client = self._clients.get(address)
+            if client is not None:
+                client.process_datagram(message)
+
+    def _handle_hello(self, message, address):
+        """Asociar la dirección al cliente dueño del token y confirmarlo"""
+        with self._lock:
+            client = self._tokens.get(message.get('token'))
+            if client is None or client.player_number != message.get('player_number'):
+                return
+            if client.udp_address is not None:
+                self._clients.pop(client.udp_address, None)
+            client.udp_address = address
+            self._clients[address] = client
+        # Sin clientes UDP no se reconstruyen los estados: empezar con un keyframe
+        client.server.protocol.request_keyframe()
+        self.send(client, encode_datagram(
+            self.server.protocol.udp_hello(client.player_number, message['token'])))
+
+    def stop(self):
+        self.running = False
+        if self.socket:
+            try:
+                self.socket.close()
+            except OSError:
+                pass
+
+
+class DatagramClient:
+    """
+    Extremo UDP del cliente
+    Hasta recibir la respuesta del servidor repite 'udp_hello'; después
+    entrega los estados recibidos a on_message y envía los inputs con
+    redundancia
+    """
+
+    def __init__(self, protocol, server_address, player_number, token, on_message,
+                 redundancy=INPUT_REDUNDANCY):
+        self.protocol = protocol
+        self.server_address = server_address
+        self.player_number = player_number
+        self.token = token
+        self.on_message = on_message
+        self.redundancy = redundancy
+        self.socket = None
+        self.running = False
+        self.active = False  # El servidor confirmó el canal
+        self._inputs = []  # Inputs aún sin confirmar por el host: (seq, input)
+        self._lock = threading.Lock()
+
+    def start(self):
+        try:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.connect(self.server_address)
+            self.socket.settimeout(UDP_HELLO_INTERVAL)
+        except OSError as e:
+            print(f"⚠️ Canal UDP no disponible: {e}")
+            return False
+        self.running = True
+        receive_thread = threading.Thread(target=self._receive_loop)
+        receive_thread.daemon = True
+        receive_thread.start()
+        return True
+
+    def send_input(self, seq, input_name):
+        """Enviar un input junto con los anteriores que el host aún no confirmó"""
+        with self._lock:
+            self._inputs.append((seq, input_name))
+            del self._inputs[:-self.redundancy]
+        return self._send_inputs()
+
+    def _send_inputs(self):
+        with self._lock:
+            inputs = list(self._inputs)
+        if not inputs:
+            return True
+        return self._send(self.protocol.player_inputs(self.player_number, inputs))
+
+    def _send(self, message):
+        datagram = encode_datagram(message)
+        if datagram is None or not self.running:
+            return False
+        try:
+            self.socket.send(datagram)
+            return True
+        except OSError:
+            return False
+
+    def _receive_loop(self):
+        while self.running:
+            if not self.active:
+                self._send(self.protocol.udp_hello(self.player_number, self.token))
+            try:
+                data = self.socket.recv(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                if not self.running:
+                    break
+                continue  # p. ej. ICMP "puerto inalcanzable" mientras el servidor arranca
+
+            message = decode_datagram(data)
+            if message is None:
+                continue
+            if message['type'] == self.protocol.MSG_UDP_HELLO:
+                if not self.active:
+                    self.active = True
+                    print("📡 Canal UDP activo para estados e inputs")
+                continue
+
+            self._acknowledge(message.get('acks') or {})
+            self.on_message(message)
+
+    def _acknowledge(self, acks):
+        """
+        Olvidar los inputs confirmados y repetir los que siguen pendientes
+        (también sin ack del jugador: al empezar cada ronda el host aún no confirmó ninguno)
+        """
+        ack = acks.get(self.player_number)
+        acked_seq = ack[0] if ack else 0
+        with self._lock:
+            self._inputs = [(seq, name) for seq, name in self._inputs if seq > acked_seq]
+            pending = bool(self._inputs)
+        if pending:
+            self._send_inputs()
+
+    def stop(self):
+        self.running = False
+        self.active = False
+        if self.socket:
+            try:
+                self.socket.close()
+            except OSError:
+                pass
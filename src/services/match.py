@@ -0,0 +1,87 @@
+from src.simulation import GameSimulation
+
+
+class Match:
+    """
+    Partida autoritativa sin pygame: cuenta regresiva, simulación y nombres
+    Expone los mismos atributos que lee GameProtocol._serialize_game_state
+    (game_state, countdown, winner, snakes, fruit, mine, player_names)
+    """
+
+    def __init__(self, game_mode='multiplayer', countdown_seconds=3, restart_delay=5.0):
+        self.game_mode = game_mode
+        self.countdown_seconds = countdown_seconds
+        self.restart_delay = restart_delay
+
+        self.game_state = 'start'
+        self.countdown = 0
+        self.winner = None
+        self.simulation = None
+        self.player_names = {}
+        self.pending_inputs = []
+        self.input_acks = {}  # Jugador -> (seq del último input aplicado, tick en que se aplicó)
+        self._next_phase_at = None
+
+    @property
+    def snakes(self):
+        return self.simulation.snakes if self.simulation else {}
+
+    @property
+    def fruit(self):
+        return self.simulation.fruit if self.simulation else None
+
+    @property
+    def mine(self):
+        return self.simulation.mine if self.simulation else None
+
+    @property
+    def tick(self):
+        return self.simulation.tick if self.simulation else 0
+
+    def start(self, players, now):
+        """Crear la simulación para los jugadores indicados e iniciar la cuenta regresiva"""
+        self.simulation = GameSimulation(players=sorted(players))
+        self.pending_inputs = []
+        self.input_acks = {}
+        self.winner = None
+        self.game_state = 'countdown'
+        self.countdown = self.countdown_seconds
+        self._next_phase_at = now + 1.0
+
+    def queue_input(self, player_number, input_name, seq=None):
+        """Guardar un input para aplicarlo en el siguiente tick"""
+        self.pending_inputs.append((player_number, input_name, seq))
+
+    def set_player_name(self, player_number, name):
+        self.player_names[player_number] = name
+
+    def should_restart(self, now):
+        """Indica si terminó la pausa tras el fin de la partida"""
+        return self.game_state == 'game_over' and now >= self._next_phase_at
+
+    def update(self, now):
+        """
+        Avanzar la partida un tick
+        Devuelve los eventos de la simulación (lista vacía fuera del juego)
+        """
+        if self.game_state == 'countdown':
+            if now >= self._next_phase_at:
+                self.countdown -= 1
+                self._next_phase_at = now + 1.0
+                if self.countdown <= 0:
+                    self.game_state = 'playing'
+            return []
+
+        if self.game_state != 'playing':
+            return []
+
+        inputs, self.pending_inputs = self.pending_inputs, []
+        events = self.simulation.step([(player, input_name) for player, input_name, _ in inputs])
+        for player, _, seq in inputs:
+            if seq is not None:
+                self.input_acks[player] = (seq, self.simulation.tick)
+        if self.simulation.game_state == 'game_over':
+            self.game_state = 'game_over'
+            self.winner = self.simulation.winner
+            self._next_phase_at = now + self.restart_delay
+        return events
@@ -1,42 +1,215 @@
+import asyncio
+import copy
+import itertools
 import socket
+import struct
 import threading
-import pickle
 import time
+from collections import deque
+from src.constants import (ALLOW_PICKLE, BUFFER_SIZE, MAX_MESSAGE_SIZE, MAX_PLAYERS, MAX_QUEUED_MESSAGES,
+                           SERVER_ENGINE, USE_UDP, TICK_RATE, MAX_ROOMS)
+from src.scheduler import TickScheduler, TimerWheel
+from src.services.codec import (BINARY_CODEC, BINARY_CODECS, CODECS, PICKLE_CODEC,
+                                decode_payload, encode_payload)
+from src.services.datagram import DatagramServer, DatagramClient, encode_datagram
+from src.services.match import Match
 from src.services.protocol import GameProtocol
 
+# Cabecera de cada mensaje: longitud del payload (uint32, big-endian)
+FRAME_HEADER = struct.Struct('!I')
+
+# Tipos de estado en las colas de salida
+FRAME_KEYFRAME = 'keyframe'
+FRAME_DELTA = 'delta'
+
+
+def encode_frame(message, codec=PICKLE_CODEC):
+    """Serializar un mensaje con el codec indicado y anteponer su cabecera de longitud"""
+    payload = encode_payload(message, codec)
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+class FrameReader:
+    """
+    Reensamblar mensajes enmarcados a partir de un flujo TCP
+    Los datos se reciben directamente en un buffer reutilizable y cada
+    mensaje se deserializa desde una vista (memoryview) sin copias intermedias
+    Solo se decodifican los codecs de 'codecs' (se restringe al negociar la versión)
+    """
+
+    def __init__(self, sock=None, max_message_size=MAX_MESSAGE_SIZE, codecs=CODECS):
+        self.socket = sock
+        self.max_message_size = max_message_size
+        self.codecs = codecs
+        self._buffer = bytearray(BUFFER_SIZE)
+        self._start = 0  # Inicio de los datos pendientes de procesar
+        self._end = 0    # Fin de los datos recibidos
+
+    def read_messages(self):
+        """
+        Leer del socket y devolver la lista de mensajes completos
+        Devuelve None si el otro extremo cerró la conexión
+        """
+        self._reserve(BUFFER_SIZE)
+        with memoryview(self._buffer) as view:
+            received = self.socket.recv_into(view[self._end:])
+        if not received:
+            return None
+        self._end += received
+        return self._drain()
+
+    def feed(self, data):
+        """Añadir bytes recibidos por otro medio y devolver los mensajes completos"""
+        self._reserve(len(data))
+        self._buffer[self._end:self._end + len(data)] = data
+        self._end += len(data)
+        return self._drain()
+
+    def _reserve(self, size):
+        """Garantizar espacio libre al final del buffer"""
+        if len(self._buffer) - self._end >= size:
+            return
+        # Mover los datos pendientes al principio antes de crecer
+        pending = self._end - self._start
+        if self._start:
+            self._buffer[:pending] = self._buffer[self._start:self._end]
+            self._start, self._end = 0, pending
+        if len(self._buffer) - self._end < size:
+            self._buffer.extend(bytes(pending + size - len(self._buffer)))
+
+    def _drain(self):
+        """Extraer todos los mensajes completos del buffer"""
+        messages = []
+        header_size = FRAME_HEADER.size
+        with memoryview(self._buffer) as view:
+            while self._end - self._start >= header_size:
+                (length,) = FRAME_HEADER.unpack_from(view, self._start)
+                if length > self.max_message_size:
+                    raise ValueError(f"Mensaje demasiado grande: {length} bytes")
+                frame_end = self._start + header_size + length
+                if frame_end > self._end:
+                    # Mensaje incompleto: reservar espacio para el resto
+                    break
+                messages.append(decode_payload(view[self._start + header_size:frame_end], self.codecs))
+                self._start = frame_end
+        if self._start == self._end:
+            self._start = self._end = 0
+        elif self._end - self._start >= header_size:
+            (length,) = FRAME_HEADER.unpack_from(self._buffer, self._start)
+            self._reserve(header_size + length - (self._end - self._start))
+        return messages
+
+
+class OutboundQueue:
+    """
+    Cola de salida acotada de un cliente (mensajes ya codificados)
+    Un keyframe de estado reemplaza a los estados que aún no se enviaron:
+    el cliente solo necesita el más reciente y los deltas anteriores
+    quedan cubiertos por él. Los deltas nunca se descartan solos, rompería
+    la cadena de snapshots
+    """
+    
+    def __init__(self, maxsize=MAX_QUEUED_MESSAGES):
+        self.maxsize = maxsize
+        self._frames = deque()  # (frame, tipo de estado o None)
+    
+    def __len__(self):
+        return len(self._frames)
+    
+    def push(self, frame, kind=None):
+        """Encolar un mensaje; devuelve False si la cola está llena"""
+        if kind == FRAME_KEYFRAME and any(queued_kind for _, queued_kind in self._frames):
+            self._frames = deque(item for item in self._frames if item[1] is None)
+        if len(self._frames) >= self.maxsize:
+            return False
+        self._frames.append((frame, kind))
+        return True
+    
+    def pop(self):
+        return self._frames.popleft()[0]
+    
+    def clear(self):
+        self._frames.clear()
+
+
+def frame_kind(message):
+    """Tipo de estado de un mensaje para OutboundQueue (None si no es un estado)"""
+    msg_type = message.get('type')
+    if msg_type == GameProtocol.MSG_GAME_STATE_UPDATE:
+        return FRAME_KEYFRAME
+    if msg_type == GameProtocol.MSG_GAME_STATE_DELTA:
+        return FRAME_DELTA
+    return None
+
+
 class GameServer:
-    def __init__(self, host='0.0.0.0', port=5555):
+    def __init__(self, host='0.0.0.0', port=5555, max_players=MAX_PLAYERS,
+                 max_queued_messages=MAX_QUEUED_MESSAGES, udp=USE_UDP, allow_pickle=ALLOW_PICKLE):
         self.host = host
         self.port = port
+        self.max_players = max_players
+        self.max_queued_messages = max_queued_messages
+        self.udp = udp
+        self.allow_pickle = allow_pickle  # Aceptar el codec pickle (protocolo 1.0) de los clientes
+        self.datagrams = None  # Canal UDP para estados e inputs (si udp está activo)
         self.server_socket = None
         self.clients = []
         self.game_state = None
         self.running = False
         self.protocol = GameProtocol()
         
+        # Partida autoritativa del servidor: recibe inputs y nombres en lugar del host
+        self.input_handler = None
+        self.name_handler = None
+        self.match = None
+        self.host_starts_match = False  # El jugador 1 inicia la partida con 'game_start'
+        self._match_lock = threading.Lock()
+        self.rooms = None  # RoomManager si el servidor aloja varias partidas
+        self.tick_rate = TICK_RATE
+        
     def start_server(self):
         """Iniciar el servidor"""
         try:
             self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(5)  # Cambiado de 2 a 5 jugadores máximos
+            self.server_socket.listen(self.max_players)
             self.running = True
             
             print(f"🎮 Servidor iniciado en {self.host}:{self.port}")
-            print("Esperando jugadores... (Máximo 5)")
+            print(f"Esperando jugadores... (Máximo {self.max_players})")
             
             # Hilo para aceptar conexiones
             accept_thread = threading.Thread(target=self._accept_connections)
             accept_thread.daemon = True
             accept_thread.start()
             
+            self._start_datagrams()
             return True
             
         except Exception as e:
             print(f"❌ Error al iniciar servidor: {e}")
             return False
     
+    def _start_datagrams(self):
+        """Abrir el canal UDP opcional en el mismo puerto"""
+        if not self.udp:
+            return
+        datagrams = DatagramServer(self, self.host, self.port)
+        if datagrams.start():
+            self.datagrams = datagrams
+    
+    def connection_count(self):
+        """Clientes conectados al servidor: los del lobby y los que están en una sala"""
+        count = len(self.clients)
+        if self.rooms is not None:
+            count += self.rooms.player_count()
+        return count
+    
+    def accepted_codecs(self):
+        """Codecs que se aceptan de un cliente antes de negociar la versión"""
+        return CODECS if self.allow_pickle else BINARY_CODECS
+    
     def _accept_connections(self):
         """Aceptar conexiones de clientes"""
         while self.running:
@@ -45,13 +218,13 @@ class GameServer:
                 print(f"✅ Jugador conectado desde {address}")
                 
                 # Verificar si hay espacio para más jugadores
-                if len(self.clients) >= 5:
+                if self.connection_count() >= self.max_players:
                     print("❌ Servidor lleno, rechazando conexión")
                     client_socket.close()
                     continue
                 
                 # Asignar número de jugador
-                player_number = len(self.clients) + 1
+                player_number = self._next_player_number()
                 
                 client_handler = ClientHandler(client_socket, address, player_number, self)
                 self.clients.append(client_handler)
@@ -61,21 +234,41 @@ class GameServer:
                 client_thread.daemon = True
                 client_thread.start()
                 
-                # Notificar a todos los clientes sobre el nuevo jugador
-                self.broadcast(self.protocol.player_joined(player_number))
-                
-                print(f"👥 Jugadores conectados: {len(self.clients)}/5")
-                
-                # Si hay al menos 2 jugadores, permitir inicio del juego
-                if len(self.clients) >= 2:
-                    print("🎯 Mínimo 2 jugadores conectados - El host puede iniciar el juego")
-                    # Notificar al host que puede iniciar
-                    self.notify_host_game_can_start()
+                self._on_player_joined(player_number)
                     
             except Exception as e:
                 if self.running:
                     print(f"❌ Error aceptando conexión: {e}")
     
+    def _next_player_number(self):
+        """Menor número de jugador libre (se reutilizan los de jugadores desconectados)"""
+        taken = {client.player_number for client in self.clients}
+        player_number = 1
+        while player_number in taken:
+            player_number += 1
+        return player_number
+    
+    def _on_player_joined(self, player_number):
+        """Notificar la llegada de un nuevo jugador"""
+        if self.is_lobby():
+            # Aún no está en ninguna partida: enviarle las salas para que elija una
+            for client in self.clients[:]:
+                if client.player_number == player_number:
+                    client.send(self.protocol.room_list(self.rooms.list_rooms()))
+            return
+        # Notificar a todos los clientes sobre el nuevo jugador
+        self.broadcast(self.protocol.player_joined(player_number))
+        # El nuevo jugador necesita un estado completo para aplicar deltas
+        self.protocol.request_keyframe()
+        
+        print(f"👥 Jugadores conectados: {len(self.clients)}/{self.max_players}")
+        
+        # Si hay al menos 2 jugadores, permitir inicio del juego
+        if len(self.clients) >= 2:
+            print("🎯 Mínimo 2 jugadores conectados - El host puede iniciar el juego")
+            # Notificar al host que puede iniciar
+            self.notify_host_game_can_start()
+    
     def notify_host_game_can_start(self):
         """Notificar al host que puede iniciar el juego"""
         for client in self.clients:
@@ -85,28 +278,199 @@ class GameServer:
                 except:
                     pass
     
+    def is_lobby(self):
+        """Servidor de salas: los clientes conectados esperan a entrar en una"""
+        return self.rooms is not None and self.match is None
+    
+    def remove_client(self, client):
+        """Quitar un cliente y avisar al resto; devuelve False si ya no estaba"""
+        if client not in self.clients:
+            return False
+        self.clients.remove(client)
+        if self.is_lobby():
+            return True
+        print(f"👋 Jugador {client.player_number} desconectado")
+        print(f"👥 Jugadores restantes: {len(self.clients)}/{self.max_players}")
+        # Notificar a otros clientes
+        self.broadcast(self.protocol.player_disconnected(client.player_number))
+        return True
+    
     def broadcast(self, data):
-        """Enviar datos a todos los clientes"""
+        """
+        Enviar datos a todos los clientes
+        El mensaje se codifica una sola vez por codec y el mismo buffer
+        se escribe en todos los sockets
+        """
+        frames = {}
+        kind = frame_kind(data)
+        try:
+            udp_state = self._udp_state(data) if kind else None
+        except Exception as e:
+            print(f"❌ Error codificando el estado para UDP: {e}")
+            return
+        # Primero se codifica todo: si el mensaje no se puede serializar no se envía a nadie
+        deliveries = []
         for client in self.clients[:]:  # Copia de la lista para evitar problemas
+            if udp_state is not None and client.udp_address is not None:
+                deliveries.append((client, None))
+                continue
+            frame = frames.get(client.codec.codec_id)
+            if frame is None:
+                try:
+                    frame = frames[client.codec.codec_id] = encode_frame(data, client.codec)
+                except Exception as e:
+                    print(f"❌ Error codificando mensaje {data.get('type')}: {e}")
+                    return
+            deliveries.append((client, frame))
+        for client, frame in deliveries:
+            frame_type = kind
+            if frame is None:
+                # Estado completo por UDP; si no cabe en un datagrama, el mismo keyframe por TCP
+                datagram, message = udp_state
+                if self.datagrams.send(client, datagram):
+                    continue
+                try:
+                    frame = encode_frame(message, client.codec)
+                except Exception as e:
+                    print(f"❌ Error codificando el keyframe de respaldo: {e}")
+                    continue
+                frame_type = frame_kind(message)
             try:
-                client.send(data)
-            except:
-                self.clients.remove(client)
+                client.send_frame(frame, frame_type)
+            except Exception as e:
+                print(f"⚠️ Error enviando al jugador {client.player_number}: {e}")
+                client.disconnect()
+    
+    def _udp_state(self, data):
+        """
+        Estado completo para los clientes con canal UDP
+        Los deltas se aplican sobre el último estado difundido y se envían
+        como keyframe: un datagrama perdido no debe romper la cadena de deltas
+        Devuelve (datagrama o None si no cabe, mensaje) o None si ningún cliente usa UDP
+        """
+        if self.datagrams is None or not any(client.udp_address for client in self.clients[:]):
+            return None
+        if data['type'] != self.protocol.MSG_GAME_STATE_DELTA:
+            # receive_state anota sim_tick y acks en el estado: no tocar el snapshot compartido
+            data = dict(data, state=dict(data['state']))
+        state = self.protocol.receive_state(data)
+        if state is None:
+            return None
+        message = self.protocol.game_state_update(state, data.get('sim_tick'), data.get('acks'))
+        return encode_datagram(message), message
     
-    def update_game_state(self, game_state):
+    def update_game_state(self, game_state, sim_tick=None, acks=None):
         """Actualizar estado del juego y enviar a clientes"""
         self.game_state = game_state
         if self.clients:
-            self.broadcast(self.protocol.game_state_update(game_state))
+            self.broadcast(self.protocol.game_state_update(game_state, sim_tick, acks))
     
-    def handle_player_input(self, player_number, input_data):
-        """Manejar input de jugador y broadcast"""
-        self.broadcast(self.protocol.player_input(player_number, input_data))
+    def broadcast_game_state(self, game_state):
+        """Difundir un estado generado en el propio servidor (keyframe o delta)"""
+        if self.clients:
+            self.broadcast(self.protocol.game_state_snapshot(
+                game_state, keyframe_type=self.protocol.MSG_GAME_STATE_UPDATE))
+    
+    def relay_game_state_delta(self, delta_message):
+        """Reenviar un delta de estado del host a los clientes"""
+        if self.clients:
+            self.broadcast(delta_message)
+    
+    def handle_player_input(self, player_number, input_data, seq=None):
+        """Manejar input de jugador y broadcast (seq: tick del mensaje del cliente)"""
+        if self.input_handler:
+            # Servidor dedicado: el input se aplica a la simulación del servidor
+            self.input_handler(player_number, input_data, seq)
+            return
+        self.broadcast(self.protocol.player_input(player_number, input_data, seq))
     
     def handle_player_name(self, player_number, player_name):
         """Manejar nombre de jugador y broadcast"""
+        if self.name_handler:
+            self.name_handler(player_number, player_name)
         self.broadcast(self.protocol.player_name_update(player_number, player_name))
     
+    def attach_match(self, match, host_starts=False, tick_rate=TICK_RATE):
+        """
+        Ejecutar la partida en el servidor: los inputs se aplican a su simulación
+        y solo se difunde el estado resultante (los estados de los clientes se ignoran)
+        tick_rate se anuncia en 'game_start' para que los clientes predigan a ese ritmo
+        """
+        self.match = match
+        self.host_starts_match = host_starts
+        self.tick_rate = tick_rate
+        self.input_handler = self._queue_match_input
+        self.name_handler = self._set_match_player_name
+    
+    def host_match(self, match, tick_rate=TICK_RATE):
+        """Partida del servidor de un jugador host, con su propio hilo de ticks"""
+        self.attach_match(match, host_starts=True, tick_rate=tick_rate)
+        match_thread = threading.Thread(target=self._run_match, args=(tick_rate,))
+        match_thread.daemon = True
+        match_thread.start()
+    
+    def _run_match(self, tick_rate):
+        """Bucle de ticks de la partida mientras el servidor esté activo"""
+        scheduler = TickScheduler(tick_rate, clock=time.monotonic)
+        while self.running:
+            now = time.monotonic()
+            for _ in range(scheduler.advance(now)):
+                self.step_match(now)
+            time.sleep(scheduler.time_until_next())
+    
+    def _queue_match_input(self, player_number, input_data, seq=None):
+        with self._match_lock:
+            self.match.queue_input(player_number, input_data, seq)
+    
+    def _set_match_player_name(self, player_number, player_name):
+        with self._match_lock:
+            self.match.set_player_name(player_number, player_name)
+    
+    def start_match(self, now=None):
+        """Iniciar la partida con los jugadores conectados y avisar a todos"""
+        players = [client.player_number for client in self.clients[:]]
+        with self._match_lock:
+            self.match.start(players, time.monotonic() if now is None else now)
+            # Nueva partida: los clientes necesitan un estado completo
+            self.protocol.request_keyframe()
+        self.broadcast(self.protocol.game_start(self.tick_rate))
+        print(f"🎯 Iniciando partida con los jugadores {sorted(players)}")
+    
+    def auto_step_match(self, now, min_players=2):
+        """
+        Servidor dedicado: iniciar la partida al reunir min_players (y reiniciarla
+        tras la pausa del fin de partida), después avanzarla un tick
+        Devuelve el estado antes del tick, o None si se sigue esperando jugadores
+        """
+        match = self.match
+        if match.game_state == 'start' or match.should_restart(now):
+            if len(self.clients) >= min_players:
+                self.start_match(now)
+            else:
+                match.game_state = 'start'
+                return None
+        return self.step_match(now)
+    
+    def step_match(self, now):
+        """
+        Avanzar la partida un tick y difundir el estado si hay partida en curso
+        Devuelve el estado de la partida antes del tick
+        """
+        match = self.match
+        message = None
+        with self._match_lock:
+            previous_state = match.game_state
+            match.update(now)
+            # El snapshot se arma con el lock: start_match puede cambiar la simulación desde otro hilo
+            if self.clients and (match.game_state in ('countdown', 'playing')
+                                 or match.game_state != previous_state):
+                # Copia profunda: el mensaje no debe compartir objetos con la simulación
+                message = copy.deepcopy(self.protocol.game_state_snapshot(
+                    match, keyframe_type=self.protocol.MSG_GAME_STATE_UPDATE))
+        if message is not None:
+            self.broadcast(message)
+        return previous_state
+    
     def stop_server(self):
         """Detener servidor"""
         self.running = False
@@ -114,6 +478,8 @@ class GameServer:
             client.disconnect()
         if self.server_socket:
             self.server_socket.close()
+        if self.datagrams:
+            self.datagrams.stop()
         print("🛑 Servidor detenido")
 
 
@@ -124,25 +490,38 @@ class ClientHandler:
         self.player_number = player_number
         self.server = server
         self.running = True
+        self.reader = FrameReader(socket, codecs=server.accepted_codecs())
+        self.codec = BINARY_CODEC  # Hasta que el cliente negocie otra versión
+        self.udp_address = None  # Dirección del canal UDP, una vez abierto
+        self.last_input_seq = 0  # Último input aplicado (los de UDP llegan repetidos)
+        self.player_name = None  # Se conserva al cambiar de sala
+        
+        # Cola de salida propia: el hilo escritor es el único que toca el socket para enviar,
+        # así un cliente lento no bloquea al hilo que hace el broadcast
+        self.outbox = OutboundQueue(server.max_queued_messages)
+        self._outbox_ready = threading.Condition()
     
     def handle_client(self):
         """Manejar comunicación con el cliente"""
+        writer_thread = threading.Thread(target=self._write_loop)
+        writer_thread.daemon = True
+        writer_thread.start()
         try:
             # Enviar número de jugador al cliente
             self.send(self.server.protocol.assign_player(self.player_number))
             
             # Enviar información de jugadores conectados
             connected_players = len(self.server.clients)
-            self.send(self.server.protocol.connected_players(connected_players))
+            self.send(self.server.protocol.connected_players(connected_players, self.server.max_players))
             
             while self.running:
-                data = self.socket.recv(4096)
-                if not data:
+                messages = self.reader.read_messages()
+                if messages is None:
                     break
                     
-                # Procesar mensaje del cliente
-                message = pickle.loads(data)
-                self._process_message(message)
+                # Procesar mensajes del cliente
+                for message in messages:
+                    self._process_message(message)
                 
         except Exception as e:
             print(f"❌ Error con cliente {self.player_number}: {e}")
@@ -153,51 +532,571 @@ class ClientHandler:
         """Procesar mensaje del cliente"""
         msg_type = message.get('type')
         
-        if msg_type == 'player_input':
+        if msg_type == 'hello':
+            # Negociar versión de protocolo y codec de red
+            version = self.server.protocol.negotiate_version(message.get('versions', []),
+                                                             self.server.allow_pickle)
+            if version is None:
+                raise ValueError(f"Versiones no soportadas: {message.get('versions')}")
+            self.codec = self.server.protocol.codec_for_version(version)
+            # A partir de aquí solo se acepta el codec negociado
+            self.reader.codecs = {self.codec.codec_id: self.codec}
+            self.send(self.server.protocol.version_ack(version))
+            
+        elif msg_type == 'player_input':
             # Reenviar input a todos los clientes
-            self.server.handle_player_input(self.player_number, message['input'])
+            self._handle_input(message['input'], message.get('tick'))
             
-        elif msg_type == 'game_state':
-            # Actualizar estado del juego en servidor
-            self.server.update_game_state(message['state'])
+        elif msg_type == 'udp_request':
+            # Abrir canal UDP para estados e inputs, si el servidor lo ofrece
+            if self.server.datagrams is not None:
+                self.send(self.server.protocol.udp_token(self.server.datagrams.register(self)))
+            
+        elif msg_type == 'game_start':
+            # El host pide iniciar (o reiniciar) la partida del servidor
+            if self.server.match is not None and self.server.host_starts_match and self.player_number == 1:
+                self.server.start_match()
+            
+        elif msg_type in ('game_state', 'game_state_delta'):
+            # Sin partida en el servidor, el host (jugador 1) difunde su propio estado;
+            # con ella, el estado es siempre el del servidor
+            if self.server.match is None and self.player_number == 1:
+                self._relay_host_state(message)
             
         elif msg_type == 'player_name':
             # Actualizar nombre del jugador
+            self.player_name = message['name']
             self.server.handle_player_name(self.player_number, message['name'])
+            
+        elif msg_type in ('list_rooms', 'create_room', 'join_room'):
+            self._handle_room_message(message)
+    
+    def _handle_room_message(self, message):
+        """Lista de salas, crear una o unirse a una (solo en servidores con salas)"""
+        rooms = self.server.rooms
+        if rooms is None:
+            self.send(self.server.protocol.error("El servidor no tiene salas"))
+            return
+        
+        if message['type'] == 'list_rooms':
+            self.send(self.server.protocol.room_list(rooms.list_rooms()))
+            return
+        
+        if message['type'] == 'create_room':
+            room = rooms.open_room(self, message.get('name'), message.get('max_players') or MAX_PLAYERS)
+        else:
+            room = rooms.join(self, message.get('room_id'))
+        if room is None:
+            self.send(self.server.protocol.error("Sala llena, inexistente o límite de salas alcanzado"))
+    
+    def _relay_host_state(self, message):
+        if message['type'] == 'game_state':
+            # Actualizar estado del juego en servidor
+            self.server.update_game_state(message['state'], message.get('sim_tick'), message.get('acks'))
+        else:
+            # Reenviar los cambios de estado a todos los clientes
+            self.server.relay_game_state_delta(message)
+    
+    def process_datagram(self, message):
+        """Procesar un mensaje recibido por el canal UDP (solo inputs)"""
+        if message.get('type') != 'player_inputs' or message.get('player_number') != self.player_number:
+            return
+        for seq, input_name in message['inputs']:
+            self._handle_input(input_name, seq)
+    
+    def _handle_input(self, input_name, seq):
+        """Aplicar cada input una sola vez aunque llegue repetido"""
+        if seq is not None:
+            if seq <= self.last_input_seq:
+                return
+            self.last_input_seq = seq
+        self.server.handle_player_input(self.player_number, input_name, seq)
     
     def send(self, data):
         """Enviar datos al cliente"""
-        try:
-            self.socket.send(pickle.dumps(data))
-        except:
+        self.send_frame(encode_frame(data, self.codec), frame_kind(data))
+    
+    def send_frame(self, frame, kind=None):
+        """Encolar un mensaje ya codificado sin bloquear"""
+        with self._outbox_ready:
+            if not self.running:
+                return
+            queued = self.outbox.push(frame, kind)
+            if queued:
+                self._outbox_ready.notify()
+        if not queued:
+            print(f"⚠️ Jugador {self.player_number} no consume sus mensajes, desconectando")
             self.disconnect()
     
+    def _write_loop(self):
+        """Hilo escritor: vaciar la cola de salida en el socket"""
+        while True:
+            with self._outbox_ready:
+                while self.running and not self.outbox:
+                    self._outbox_ready.wait()
+                if not self.running:
+                    return
+                frame = self.outbox.pop()
+            try:
+                self.socket.sendall(frame)
+            except:
+                self.disconnect()
+                return
+    
     def disconnect(self):
         """Desconectar cliente"""
         self.running = False
+        self._close_socket()
+        if self.server.datagrams is not None:
+            self.server.datagrams.unregister(self)
+        self.server.remove_client(self)
+    
+    def _close_socket(self):
+        """Cerrar el socket del cliente y despertar al hilo escritor"""
+        with self._outbox_ready:
+            self.outbox.clear()
+            self._outbox_ready.notify()
         try:
             self.socket.close()
         except:
             pass
+
+
+class AsyncGameServer(GameServer):
+    """
+    Servidor basado en asyncio: un único bucle de eventos atiende todas las conexiones
+    Mantiene la misma API de mensajes que GameServer, pero las escrituras no bloquean
+    y cada cliente tiene su propia cola de salida (un socket lento no frena el broadcast)
+    """
+    
+    def __init__(self, host='0.0.0.0', port=5555, max_players=MAX_PLAYERS,
+                 max_queued_messages=MAX_QUEUED_MESSAGES, udp=USE_UDP, allow_pickle=ALLOW_PICKLE):
+        super().__init__(host, port, max_players, max_queued_messages, udp, allow_pickle)
+        self.loop = None
+        self.loop_thread = None
+        self._listener = None
+    
+    def start_server(self):
+        """Iniciar el servidor en un hilo con su propio bucle de eventos"""
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+        result = {'ok': False}
+        
+        def run_loop():
+            asyncio.set_event_loop(self.loop)
+            try:
+                self.loop.run_until_complete(self._start_listener())
+                result['ok'] = True
+            except Exception as e:
+                print(f"❌ Error al iniciar servidor: {e}")
+            finally:
+                started.set()
+            if result['ok']:
+                self.loop.run_forever()
+                # Cancelar las tareas de clientes que sigan pendientes
+                pending = asyncio.all_tasks(self.loop)
+                for task in pending:
+                    task.cancel()
+                self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.close()
+        
+        self.loop_thread = threading.Thread(target=run_loop)
+        self.loop_thread.daemon = True
+        self.loop_thread.start()
+        started.wait()
+        if result['ok']:
+            self._start_datagrams()
+        return result['ok']
+    
+    async def _start_listener(self):
+        """Abrir el socket de escucha"""
+        self._listener = await asyncio.start_server(
+            self._accept_connection, self.host, self.port,
+            reuse_address=True, backlog=self.max_players
+        )
+        self.running = True
+        print(f"🎮 Servidor asyncio iniciado en {self.host}:{self.port}")
+        print(f"Esperando jugadores... (Máximo {self.max_players})")
+    
+    async def _accept_connection(self, reader, writer):
+        """Atender una nueva conexión dentro del bucle de eventos"""
+        address = writer.get_extra_info('peername')
+        print(f"✅ Jugador conectado desde {address}")
+        
+        # Verificar si hay espacio para más jugadores
+        if self.connection_count() >= self.max_players:
+            print("❌ Servidor lleno, rechazando conexión")
+            writer.close()
+            return
+        
+        # Asignar número de jugador
+        player_number = self._next_player_number()
+        
+        client_handler = AsyncClientHandler(reader, writer, address, player_number, self)
+        self.clients.append(client_handler)
+        client_handler.start()
+        
+        self._on_player_joined(player_number)
+        await client_handler.handle_client()
+    
+    def in_loop_thread(self):
+        """Indica si el código actual se ejecuta en el hilo del bucle de eventos"""
+        return self.loop_thread is not None and threading.current_thread() is self.loop_thread
+    
+    def call_in_loop(self, callback, *args):
+        """Ejecutar una función en el bucle de eventos desde cualquier hilo"""
+        if self.in_loop_thread():
+            callback(*args)
+        elif self.loop and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(callback, *args)
+    
+    def stop_server(self):
+        """Detener servidor"""
+        if not self.loop or self.loop.is_closed():
+            return
+        self.call_in_loop(self._shutdown)
+        if not self.in_loop_thread():
+            self.loop_thread.join(timeout=2.0)
+        if self.datagrams:
+            self.datagrams.stop()
+        print("🛑 Servidor detenido")
+    
+    def _shutdown(self):
+        """Cerrar conexiones y detener el bucle (hilo del bucle)"""
+        self.running = False
+        for client in self.clients[:]:
+            client.disconnect()
+        if self._listener:
+            self._listener.close()
+        self.loop.stop()
+
+
+class AsyncClientHandler(ClientHandler):
+    """Cliente atendido por AsyncGameServer, con cola de salida acotada"""
+    
+    def __init__(self, stream_reader, writer, address, player_number, server):
+        self.stream_reader = stream_reader
+        self.writer = writer
+        self.address = address
+        self.player_number = player_number
+        self.server = server
+        self.running = True
+        self.reader = FrameReader(codecs=server.accepted_codecs())
+        self.codec = BINARY_CODEC
+        self.udp_address = None
+        self.last_input_seq = 0
+        self.player_name = None
+        self.outbox = OutboundQueue(server.max_queued_messages)
+        self._outbox_ready = asyncio.Event()
+        self._writer_task = None
+    
+    def start(self):
+        """Iniciar la tarea que vacía la cola de salida"""
+        self._writer_task = asyncio.create_task(self._write_loop())
+        
+        # Enviar número de jugador e información de jugadores conectados
+        self.send(self.server.protocol.assign_player(self.player_number))
+        self.send(self.server.protocol.connected_players(len(self.server.clients), self.server.max_players))
+    
+    async def handle_client(self):
+        """Leer y procesar mensajes del cliente"""
+        try:
+            while self.running:
+                data = await self.stream_reader.read(BUFFER_SIZE)
+                if not data:
+                    break
+                for message in self.reader.feed(data):
+                    self._process_message(message)
+        except asyncio.CancelledError:
+            pass  # El servidor se está deteniendo
+        except Exception as e:
+            if self.running:
+                print(f"❌ Error con cliente {self.player_number}: {e}")
+        finally:
+            self.disconnect()
+    
+    async def _write_loop(self):
+        """Escribir los mensajes en cola respetando el control de flujo del socket"""
+        try:
+            while self.running:
+                if not self.outbox:
+                    self._outbox_ready.clear()
+                    await self._outbox_ready.wait()
+                    continue
+                self.writer.write(self.outbox.pop())
+                # Solo esta tarea espera si el cliente no consume sus datos
+                await self.writer.drain()
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            self.disconnect()
+    
+    def send_frame(self, frame, kind=None):
+        """Encolar un mensaje ya codificado sin bloquear"""
+        self.server.call_in_loop(self._enqueue, frame, kind)
+    
+    def _enqueue(self, frame, kind=None):
+        """Añadir un mensaje a la cola de salida (hilo del bucle)"""
+        if not self.running:
+            return
+        if not self.outbox.push(frame, kind):
+            print(f"⚠️ Jugador {self.player_number} no consume sus mensajes, desconectando")
+            self.disconnect()
+            return
+        self._outbox_ready.set()
+    
+    def disconnect(self):
+        """Desconectar cliente (se ejecuta siempre en el hilo del bucle)"""
+        if not self.server.in_loop_thread():
+            self.server.call_in_loop(self.disconnect)
+            return
+        super().disconnect()
+    
+    def _close_socket(self):
+        """Cerrar el transporte y cancelar la tarea de escritura"""
+        if self._writer_task:
+            self._writer_task.cancel()
+        try:
+            self.writer.close()
+        except:
+            pass
+
+
+class Room(GameServer):
+    """
+    Una partida dentro de un servidor con salas
+    Tiene sus propios jugadores (numerados desde 1), su cadena de deltas y su
+    ritmo de ticks; no abre sockets: sus clientes llegan por el servidor
+    principal (lobby), con el que comparte el canal UDP
+    """
+    
+    def __init__(self, lobby, room_id, name, max_players=MAX_PLAYERS, tick_rate=TICK_RATE, min_players=2):
+        super().__init__(lobby.host, lobby.port, max_players, lobby.max_queued_messages, udp=False,
+                         allow_pickle=lobby.allow_pickle)
+        self.lobby = lobby
+        self.room_id = room_id
+        self.name = name
+        self.min_players = min_players
+        self.datagrams = lobby.datagrams
+        self.rooms = lobby.rooms
+        self.scheduler = TickScheduler(tick_rate, clock=time.monotonic)
+        self.running = True
+        self.attach_match(Match(), tick_rate=tick_rate)
+    
+    def describe(self):
+        """Entrada de la sala en 'room_list'"""
+        return {
+            'room_id': self.room_id,
+            'name': self.name,
+            'players': len(self.clients),
+            'max_players': self.max_players,
+            'game_state': self.match.game_state,
+        }
+    
+    def add_client(self, client):
+        """Recibir a un cliente del lobby (u otra sala) con un número de jugador de esta sala"""
+        client.player_number = self._next_player_number()
+        client.last_input_seq = 0
+        client.server = self
+        self.clients.append(client)
         
-        if self in self.server.clients:
-            self.server.clients.remove(self)
-            print(f"👋 Jugador {self.player_number} desconectado")
-            print(f"👥 Jugadores restantes: {len(self.server.clients)}/5")
-            # Notificar a otros clientes
-            self.server.broadcast(self.server.protocol.player_disconnected(self.player_number))
+        client.send(self.protocol.room_joined(self.room_id, self.name))
+        client.send(self.protocol.assign_player(client.player_number))
+        client.send(self.protocol.connected_players(len(self.clients), self.max_players))
+        self._on_player_joined(client.player_number)
+        if client.player_name:
+            self.handle_player_name(client.player_number, client.player_name)
+    
+    def step(self, now):
+        """Ejecutar los ticks de la partida que tocan según el ritmo de la sala"""
+        for _ in range(self.scheduler.advance(now)):
+            self.auto_step_match(now, self.min_players)
+    
+    # Los clientes asyncio piden al servidor su bucle de eventos: es el del lobby
+    
+    def in_loop_thread(self):
+        return self.lobby.in_loop_thread()
+    
+    def call_in_loop(self, callback, *args):
+        self.lobby.call_in_loop(callback, *args)
+
+
+class RoomManager:
+    """
+    Varias partidas independientes en un mismo proceso
+    Los clientes conectan al servidor (lobby), piden la lista de salas y crean
+    una o entran en otra. Cada sala lleva su propio TickScheduler; un único
+    TimerWheel, en un solo hilo, despierta a cada sala cuando le toca el
+    siguiente tick (no hay un hilo por sala)
+    """
+    
+    def __init__(self, server, max_rooms=MAX_ROOMS, tick_rate=TICK_RATE, min_players=2,
+                 max_players=MAX_PLAYERS):
+        self.server = server
+        self.max_rooms = max_rooms
+        self.max_players = max_players  # Tope de jugadores de cada sala
+        self.tick_rate = tick_rate
+        self.min_players = min_players
+        self.rooms = {}
+        self.wheel = TimerWheel()
+        self.running = False
+        self._room_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        
+        server.rooms = self
+        # En el lobby no hay partida: los inputs se descartan hasta entrar en una sala
+        server.input_handler = self._discard_input
+    
+    def _discard_input(self, player_number, input_data, seq=None):
+        pass
+    
+    def run(self):
+        """Bucle del timer wheel: dormir hasta la siguiente ranura y disparar las salas que tocan"""
+        self.running = True
+        while self.running:
+            self.wheel.advance()
+            time.sleep(self.wheel.time_until_next())
+    
+    def stop(self):
+        """Detener el bucle y desconectar a los jugadores de todas las salas"""
+        self.running = False
+        with self._lock:
+            rooms = list(self.rooms.values())
+            self.rooms.clear()
+        for room in rooms:
+            room.running = False
+            for client in room.clients[:]:
+                client.disconnect()
+    
+    def list_rooms(self):
+        with self._lock:
+            return [room.describe() for room in self.rooms.values()]
+    
+    def player_count(self):
+        """Jugadores sentados en alguna sala"""
+        with self._lock:
+            return sum(len(room.clients) for room in self.rooms.values())
+    
+    def open_room(self, client, name, max_players=MAX_PLAYERS):
+        """
+        Crear una sala y meter en ella al cliente; si ya existe una con ese
+        nombre, unirse a ella. Devuelve la sala o None si no fue posible
+        """
+        name = (name or '').strip()
+        with self._lock:
+            room = next((room for room in self.rooms.values() if name and room.name == name), None)
+            if room is None:
+                if len(self.rooms) >= self.max_rooms:
+                    return None
+                room_id = next(self._room_ids)
+                room = Room(self.server, room_id, name or f"Sala {room_id}",
+                            max(2, min(max_players, self.max_players)), self.tick_rate, self.min_players)
+                self.rooms[room_id] = room
+                print(f"🏠 Sala {room_id} '{room.name}' creada ({len(self.rooms)}/{self.max_rooms})")
+                self._schedule(room)
+            return self._move(client, room)
+    
+    def join(self, client, room_id):
+        """Meter al cliente en una sala existente; devuelve la sala o None si no fue posible"""
+        with self._lock:
+            return self._move(client, self.rooms.get(room_id))
+    
+    def _move(self, client, room):
+        """Pasar al cliente de su sala actual (o del lobby) a room (con el lock tomado)"""
+        if room is None or not room.running:
+            return None
+        if client.server is room:
+            return room
+        if len(room.clients) >= room.max_players:
+            return None
+        client.server.remove_client(client)
+        room.add_client(client)
+        return room
+    
+    def _schedule(self, room):
+        now = time.monotonic()
+        self.wheel.schedule(now + room.scheduler.time_until_next(now), self._step_room, room)
+    
+    def _step_room(self, room):
+        """Tick de una sala desde el timer wheel; las salas vacías se cierran"""
+        with self._lock:
+            if not room.running:
+                return
+            if not room.clients:
+                room.running = False
+                self.rooms.pop(room.room_id, None)
+                print(f"🏠 Sala {room.room_id} '{room.name}' cerrada (sin jugadores)")
+                return
+        try:
+            room.step(time.monotonic())
+        except Exception as e:
+            print(f"❌ Error en la sala {room.room_id}: {e}")
+        self._schedule(room)
+
+
+def collapse_state_messages(messages):
+    """
+    Quitar los estados que un keyframe más reciente deja obsoletos
+    Solo dentro de cada racha de estados consecutivos, para no alterar el
+    orden respecto al resto de mensajes. Gana el keyframe con el mayor
+    snapshot_id aunque llegue antes (TCP y UDP pueden desordenarse) y solo
+    se conservan los deltas posteriores a él, que encadenan con él
+    """
+    collapsed = []
+    run_start = 0  # Posición donde empieza la racha de estados actual
+    newest = None  # snapshot_id del keyframe que se conserva en la racha
+    for message in messages:
+        msg_type = message.get('type')
+        if msg_type == GameProtocol.MSG_GAME_STATE_UPDATE:
+            snapshot_id = message.get('snapshot_id', 0)
+            if newest is not None and snapshot_id < newest:
+                continue  # Keyframe atrasado
+            newest = snapshot_id
+            later = [queued for queued in collapsed[run_start:]
+                     if queued.get('snapshot_id', 0) > snapshot_id]
+            del collapsed[run_start:]
+            collapsed.append(message)
+            collapsed.extend(later)
+            continue
+        if msg_type == GameProtocol.MSG_GAME_STATE_DELTA:
+            if newest is not None and message.get('snapshot_id', 0) <= newest:
+                continue  # Ya cubierto por el keyframe
+        else:
+            run_start = len(collapsed) + 1
+            newest = None
+        collapsed.append(message)
+    return collapsed
+
+
+def create_server(host='0.0.0.0', port=5555, engine=SERVER_ENGINE, max_players=MAX_PLAYERS, udp=USE_UDP,
+                  allow_pickle=ALLOW_PICKLE):
+    """Crear un servidor con el motor indicado ('asyncio' o 'threaded')"""
+    if engine == 'asyncio':
+        return AsyncGameServer(host=host, port=port, max_players=max_players, udp=udp, allow_pickle=allow_pickle)
+    return GameServer(host=host, port=port, max_players=max_players, udp=udp, allow_pickle=allow_pickle)
 
 
 class GameClient:
-    def __init__(self):
+    def __init__(self, use_udp=USE_UDP):
         self.socket = None
         self.server_address = None
         self.player_number = None
         self.connected = False
         self.running = False
         self.protocol = GameProtocol()
-        self.message_queue = []  # Cola para almacenar mensajes recibidos
+        # Bandeja de entrada: el hilo de red hace append y el del juego popleft,
+        # ambas operaciones atómicas en deque (sin locks ni mensajes perdidos)
+        self.message_queue = deque()
+        self.inbox_high_water = 0  # Máximo de mensajes acumulados sin procesar
         self.connected_players = 0
+        self.max_players = None  # Capacidad anunciada por el servidor (None si no la envía)
+        self.reader = None
+        self.codec = BINARY_CODEC  # Se actualiza al recibir version_ack
+        self._send_lock = threading.Lock()
+        self.use_udp = use_udp
+        self.datagrams = None  # Canal UDP, si el servidor lo ofrece
+        self.room_list = []  # Última lista de salas recibida
+        self.room_id = None
         
     def connect_to_server(self, host, port):
         """Conectar al servidor"""
@@ -209,6 +1108,7 @@ class GameClient:
             self.socket.settimeout(None)  # Quitar timeout después de conectar
             self.connected = True
             self.running = True
+            self.reader = FrameReader(self.socket)
             
             print(f"✅ Conectado al servidor {host}:{port}")
             
@@ -217,6 +1117,11 @@ class GameClient:
             receive_thread.daemon = True
             receive_thread.start()
             
+            # Anunciar las versiones de protocolo soportadas
+            self._send_message(self.protocol.hello())
+            if self.use_udp:
+                self._send_message(self.protocol.udp_request())
+            
             return True
             
         except socket.timeout:
@@ -230,12 +1135,12 @@ class GameClient:
         """Recibir mensajes del servidor"""
         while self.running:
             try:
-                data = self.socket.recv(4096)
-                if not data:
+                messages = self.reader.read_messages()
+                if messages is None:
                     break
                     
-                message = pickle.loads(data)
-                self._handle_server_message(message)
+                for message in messages:
+                    self._handle_server_message(message)
                 
             except socket.timeout:
                 continue  # Timeout normal, continuar recibiendo
@@ -250,13 +1155,36 @@ class GameClient:
         """Manejar mensaje del servidor"""
         msg_type = message.get('type')
         
-        if msg_type == 'assign_player':
+        if msg_type == 'version_ack':
+            self.codec = self.protocol.codec_for_version(message['version'])
+            self.reader.codecs = {self.codec.codec_id: self.codec}
+            print(f"🔧 Protocolo negociado: {message['version']}")
+            
+        elif msg_type == 'assign_player':
             self.player_number = message['player_number']
+            if self.datagrams is not None:
+                # Al entrar en una sala cambia el número con el que se firman los inputs UDP
+                self.datagrams.player_number = self.player_number
             print(f"🎮 Eres el Jugador {self.player_number}")
             
+        elif msg_type == 'room_list':
+            self.room_list = message['rooms']
+            
+        elif msg_type == 'room_joined':
+            self.room_id = message['room_id']
+            print(f"🏠 Entraste en la sala '{message['name']}'")
+            
+        elif msg_type == 'error':
+            print(f"❌ Servidor: {message['message']}")
+            
+        elif msg_type == 'udp_token':
+            self._open_datagrams(message['token'])
+            return
+            
         elif msg_type == 'connected_players':
             self.connected_players = message['count']
-            print(f"👥 Jugadores conectados: {self.connected_players}/5")
+            self.max_players = message.get('capacity')
+            print(f"👥 Jugadores conectados: {self.players_label()}")
             
         elif msg_type == 'player_joined':
             print(f"👥 Jugador {message['player_number']} se unió")
@@ -274,26 +1202,85 @@ class GameClient:
             print(f"📝 Jugador {message['player_number']} ahora es: {message['name']}")
             
         # Almacenar todos los mensajes en la cola para que el juego los procese
+        self._queue_message(message)
+    
+    def _queue_message(self, message):
+        """Añadir un mensaje a la bandeja de entrada (hilos TCP y UDP)"""
         self.message_queue.append(message)
+        queued = len(self.message_queue)
+        if queued > self.inbox_high_water:
+            self.inbox_high_water = queued
     
-    def get_messages(self):
-        """Obtener todos los mensajes en cola y limpiar la cola"""
-        messages = self.message_queue[:]
-        self.message_queue.clear()
+    def _open_datagrams(self, token):
+        """Abrir el canal UDP con el token recibido por TCP"""
+        if self.datagrams is not None or not self.running:
+            return
+        datagrams = DatagramClient(self.protocol, self.server_address, self.player_number,
+                                   token, self._queue_message)
+        if datagrams.start():
+            self.datagrams = datagrams
+    
+    def get_messages(self, max_messages=None, collapse_states=True):
+        """
+        Sacar de la cola hasta max_messages mensajes (todos si es None)
+        Los que lleguen mientras tanto quedan en la cola para la siguiente llamada;
+        con collapse_states se descartan los estados que un keyframe posterior reemplaza
+        """
+        queue = self.message_queue
+        if not queue:
+            return []
+        count = len(queue) if max_messages is None else min(max_messages, len(queue))
+        messages = [queue.popleft() for _ in range(count)]
+        if collapse_states:
+            messages = collapse_state_messages(messages)
         return messages
     
     def send_input(self, input_data):
-        """Enviar input al servidor"""
+        """
+        Enviar input al servidor
+        Devuelve el tick del mensaje, que identifica el input en las confirmaciones del host
+        """
         if self.connected:
             message = self.protocol.player_input(self.player_number, input_data)
-            self._send_message(message)
+            # Por UDP con redundancia cuando el canal está abierto; si no, por TCP
+            datagrams = self.datagrams
+            if not (datagrams and datagrams.active and datagrams.send_input(message['tick'], input_data)):
+                self._send_message(message)
+            return message['tick']
+        return None
     
     def send_game_state(self, game_state):
-        """Enviar estado del juego al servidor (solo host)"""
+        """Enviar estado del juego al servidor (solo host, si el servidor no ejecuta la partida)"""
         if self.connected:
-            message = self.protocol.game_state(game_state)
+            message = self.protocol.game_state_snapshot(game_state)
             self._send_message(message)
     
+    def request_game_start(self):
+        """Pedir al servidor que inicie la partida (solo host)"""
+        if self.connected:
+            self._send_message(self.protocol.game_start())
+    
+    def players_label(self):
+        """Jugadores conectados, con la capacidad del servidor si la anunció ('3/5' o '3')"""
+        if self.max_players:
+            return f"{self.connected_players}/{self.max_players}"
+        return str(self.connected_players)
+    
+    def list_rooms(self):
+        """Pedir la lista de salas (llega como 'room_list')"""
+        if self.connected:
+            self._send_message(self.protocol.list_rooms())
+    
+    def create_room(self, name, max_players=MAX_PLAYERS):
+        """Crear una sala, o unirse a la que ya tenga ese nombre"""
+        if self.connected:
+            self._send_message(self.protocol.create_room(name, max_players))
+    
+    def join_room(self, room_id):
+        """Unirse a una sala de la lista"""
+        if self.connected:
+            self._send_message(self.protocol.join_room(room_id))
+    
     def send_player_name(self, player_name):
         """Enviar nombre del jugador al servidor"""
         if self.connected:
@@ -303,7 +1290,9 @@ class GameClient:
     def _send_message(self, message):
         """Enviar mensaje al servidor"""
         try:
-            self.socket.send(pickle.dumps(message))
+            frame = encode_frame(message, self.codec)
+            with self._send_lock:
+                self.socket.sendall(frame)
         except Exception as e:
             print(f"❌ Error enviando mensaje: {e}")
             self.disconnect()
@@ -312,6 +1301,14 @@ class GameClient:
         """Desconectar del servidor"""
         self.running = False
         self.connected = False
+        if self.datagrams:
+            self.datagrams.stop()
+        try:
+            if self.socket:
+                # shutdown avisa al servidor aunque el hilo receptor siga dentro de recv
+                self.socket.shutdown(socket.SHUT_RDWR)
+        except:
+            pass
         try:
             if self.socket:
                 self.socket.close()
@@ -0,0 +1,150 @@
+from collections import deque
+from src.constants import ROLLBACK_TICKS
+
+
+class SnakePredictor:
+    """
+    Predicción en el cliente de la serpiente del jugador local
+
+    La serpiente local se mueve en cada tick del cliente con sus propios
+    inputs, sin esperar al siguiente estado del host. Cada tick predicho se
+    guarda en un buffer de rollback (tick, inputs aplicados y cuerpo
+    resultante). Al llegar un estado autoritativo del tick T:
+
+    - los inputs confirmados por el host (acks) salen del buffer y, si el
+      host los aplicó en otro tick del previsto, el cliente corrige cuánto
+      va adelantado;
+    - si el cuerpo predicho para T coincide con el autoritativo no se toca
+      nada;
+    - si no coincide se rebobina al estado de T y se vuelven a simular los
+      ticks posteriores con los inputs aún sin confirmar.
+
+    Solo se predice el movimiento y la fruta; minas, choques y muertes los
+    decide siempre el host.
+    """
+
+    def __init__(self, player_number, max_ticks=ROLLBACK_TICKS):
+        self.player_number = player_number
+        self.max_ticks = max_ticks
+        self.reset()
+
+    def reset(self):
+        """Olvidar la predicción (nueva ronda o fuera de juego)"""
+        self.tick = None  # Tick de simulación de la serpiente predicha
+        self.pending = []  # Inputs locales para el próximo tick: (seq, input)
+        self.history = deque()  # (tick, inputs, cuerpo, new_block) de cada tick predicho
+        self.alive = True
+        self.authoritative_tick = None
+        self._authoritative_body = None
+        self._acked_seq = 0
+        self._applied_at = {}  # seq -> tick predicho en que se aplicó el input por primera vez
+
+    @property
+    def active(self):
+        return self.tick is not None and self.alive
+
+    def add_input(self, seq, input_name):
+        """Guardar un input local (ya enviado con número de secuencia seq)"""
+        self.pending.append((seq, input_name))
+
+    def step(self, snake, fruit_pos=None):
+        """Avanzar la serpiente local un tick; devuelve False si no hay predicción en curso"""
+        if not self.active:
+            return False
+        if self.tick - self.authoritative_tick >= self.max_ticks:
+            # El host no responde: no adelantarse más de lo que cabe en el buffer
+            return False
+        inputs, self.pending = self.pending, []
+        self.tick += 1
+        for seq, _ in inputs:
+            self._applied_at.setdefault(seq, self.tick)
+        self._advance(snake, inputs, fruit_pos)
+        return True
+
+    def reconcile(self, snake, body, direction, new_block, tick, ack=None, fruit_pos=None):
+        """
+        Corregir la predicción con el estado autoritativo del tick indicado
+        ack es (último seq aplicado por el host, tick en que lo aplicó)
+        Devuelve True si hubo que rebobinar la serpiente
+        """
+        body = tuple(body)
+        previous_tick, previous_body = self.authoritative_tick, self._authoritative_body
+        self.authoritative_tick = tick
+        self._authoritative_body = body
+        acked_seq, acked_tick = ack if ack else (0, None)
+
+        if previous_tick is not None and tick > previous_tick and body == previous_body:
+            # El tick avanzó y la serpiente no: murió en el host
+            self.alive = False
+
+        if (not self.alive or self.tick is None
+                or (previous_tick is not None and tick < previous_tick)
+                or self.tick - tick > self.max_ticks):
+            # Sin predicción válida: adoptar el estado del host tal cual
+            inputs = [entry[1] for entry in self.history] + [self.pending]
+            self.pending = self._unacked(inputs, acked_seq)
+            self._acked_seq = max(self._acked_seq, acked_seq)
+            self._set_state(snake, body, direction, new_block)
+            self.history.clear()
+            self.tick = tick
+            return True
+
+        # Adelanto respecto al host: el input confirmado se aplicó en acked_tick
+        shift = 0
+        if acked_seq > self._acked_seq:
+            self._acked_seq = acked_seq
+            applied_at = self._applied_at.get(acked_seq)
+            if applied_at is not None:
+                shift = acked_tick - applied_at
+            # Los inputs aún en vuelo se enviaron con el mismo desfase, que ya queda corregido
+            self._applied_at = {seq: applied + shift for seq, applied in self._applied_at.items()
+                                if seq > acked_seq}
+
+        # Ticks ya cubiertos por el host; sus inputs sin confirmar llegaron tarde
+        confirmed = []
+        while self.history and self.history[0][0] <= tick:
+            confirmed.append(self.history.popleft())
+        late = self._unacked([entry[1] for entry in confirmed], acked_seq)
+        predicted = confirmed[-1] if confirmed and confirmed[-1][0] == tick else None
+        if (shift == 0 and not late and predicted is not None
+                and predicted[2] == body and predicted[3] == new_block):
+            return False
+
+        self._rewind(snake, body, direction, new_block, tick, acked_seq, shift, late, fruit_pos)
+        return True
+
+    def _rewind(self, snake, body, direction, new_block, tick, acked_seq, shift, late, fruit_pos):
+        """Volver al estado autoritativo y repetir los ticks predichos con los inputs pendientes"""
+        replay = {tick + 1: list(late)} if late else {}
+        for entry_tick, inputs, _, _ in self.history:
+            replay_tick = max(tick + 1, entry_tick + shift)
+            replay.setdefault(replay_tick, []).extend(self._unacked([inputs], acked_seq))
+        target = max(tick, self.tick + shift)
+
+        self._set_state(snake, body, direction, new_block)
+        self.history.clear()
+        # Los inputs que caen después del último tick predicho esperan al siguiente step
+        self.pending = [item for replay_tick in sorted(replay) if replay_tick > target
+                        for item in replay[replay_tick]] + self.pending
+
+        self.tick = tick
+        while self.tick < target:
+            self.tick += 1
+            self._advance(snake, replay.get(self.tick, []), fruit_pos)
+
+    def _advance(self, snake, inputs, fruit_pos):
+        """Las mismas reglas de movimiento que GameSimulation.step para una serpiente"""
+        for _, input_name in inputs:
+            snake.turn(input_name)
+        snake.move_snake()
+        if fruit_pos is not None and snake.body[0] == fruit_pos:
+            snake.add_block()
+        self.history.append((self.tick, inputs, tuple(snake.body), snake.new_block))
+
+    def _set_state(self, snake, body, direction, new_block):
+        snake.body = deque(body)
+        snake.direction = direction
+        snake.new_block = new_block
+
+    def _unacked(self, input_lists, acked_seq):
+        return [(seq, name) for inputs in input_lists for seq, name in inputs if seq > acked_seq]
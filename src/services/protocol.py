@@ -1,6 +1,8 @@
-import pickle
-from datetime import datetime
-from pygame.math import Vector2
+import itertools
+import threading
+from collections import deque
+from src.constants import KEYFRAME_INTERVAL, INBOX_DRAIN_LIMIT, MAX_PLAYERS
+from src.services.codec import CODECS_BY_VERSION, PICKLE_CODEC
 
 class GameProtocol:
     """
@@ -17,29 +19,86 @@ class GameProtocol:
     MSG_PLAYER_INPUT = 'player_input'
     MSG_GAME_STATE = 'game_state'
     MSG_GAME_STATE_UPDATE = 'game_state_update'
+    MSG_GAME_STATE_DELTA = 'game_state_delta'
     MSG_GAME_OVER = 'game_over'
     MSG_PLAYER_DISCONNECTED = 'player_disconnected'
     MSG_PLAYER_NAME = 'player_name'
     MSG_PLAYER_NAME_UPDATE = 'player_name_update'
     MSG_ERROR = 'error'
+    MSG_HELLO = 'hello'
+    MSG_VERSION_ACK = 'version_ack'
+    MSG_UDP_REQUEST = 'udp_request'
+    MSG_UDP_TOKEN = 'udp_token'
+    MSG_UDP_HELLO = 'udp_hello'
+    MSG_PLAYER_INPUTS = 'player_inputs'
+    MSG_LIST_ROOMS = 'list_rooms'
+    MSG_ROOM_LIST = 'room_list'
+    MSG_CREATE_ROOM = 'create_room'
+    MSG_JOIN_ROOM = 'join_room'
+    MSG_ROOM_JOINED = 'room_joined'
+    
+    # Versiones soportadas, de la preferida a la más antigua
+    SUPPORTED_VERSIONS = ("2.0", "1.0")
     
     def __init__(self):
-        self.version = "1.0"
+        self.version = self.SUPPORTED_VERSIONS[0]
+        self._ticks = itertools.count(1)
+        
+        # Snapshots delta: último estado enviado y último estado reconstruido
+        # (el servidor los toca desde el hilo de ticks y desde los de red)
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_id = 0
+        self._sent_snapshot = None
+        self._received_snapshot = None
+        self._latest_snapshot_id = 0
+    
+    def hello(self, versions=None):
+        """Anunciar las versiones de protocolo que entiende el cliente"""
+        return {
+            'type': self.MSG_HELLO,
+            'versions': list(versions or self.SUPPORTED_VERSIONS),
+            'tick': self._next_tick()
+        }
+    
+    def version_ack(self, version):
+        """Confirmar la versión de protocolo elegida por el servidor"""
+        return {
+            'type': self.MSG_VERSION_ACK,
+            'version': version,
+            'tick': self._next_tick()
+        }
+    
+    def negotiate_version(self, offered_versions, allow_pickle=True):
+        """
+        Elegir la versión más reciente que entienden ambos extremos
+        Sin allow_pickle nunca se elige la 1.0; devuelve None si no hay ninguna común
+        """
+        for version in self.SUPPORTED_VERSIONS:
+            if version == PICKLE_CODEC.version and not allow_pickle:
+                continue
+            if version in offered_versions:
+                return version
+        return PICKLE_CODEC.version if allow_pickle else None
+    
+    def codec_for_version(self, version):
+        """Obtener el codec de red asociado a una versión de protocolo"""
+        return CODECS_BY_VERSION.get(version, PICKLE_CODEC)
     
     def assign_player(self, player_number):
         """Asignar número de jugador al cliente"""
         return {
             'type': self.MSG_ASSIGN_PLAYER,
             'player_number': player_number,
-            'timestamp': self._get_timestamp()
+            'tick': self._next_tick()
         }
     
-    def connected_players(self, count):
-        """Informar número de jugadores conectados"""
+    def connected_players(self, count, capacity=None):
+        """Informar número de jugadores conectados y, si se conoce, el máximo admitido"""
         return {
             'type': self.MSG_CONNECTED_PLAYERS,
             'count': count,
-            'timestamp': self._get_timestamp()
+            'capacity': capacity,
+            'tick': self._next_tick()
         }
     
     def player_joined(self, player_number):
@@ -47,30 +106,113 @@ class GameProtocol:
         return {
             'type': self.MSG_PLAYER_JOINED,
             'player_number': player_number,
-            'timestamp': self._get_timestamp()
+            'tick': self._next_tick()
         }
     
     def game_can_start(self):
         """Notificar que el juego puede iniciar (mínimo 2 jugadores)"""
         return {
             'type': self.MSG_GAME_CAN_START,
-            'timestamp': self._get_timestamp()
+            'tick': self._next_tick()
         }
     
-    def game_start(self):
-        """Notificar inicio del juego"""
+    def game_start(self, tick_rate=None):
+        """
+        Notificar inicio del juego
+        tick_rate: ticks por segundo de la partida del servidor (los clientes predicen a ese ritmo)
+        """
         return {
             'type': self.MSG_GAME_START,
-            'timestamp': self._get_timestamp()
+            'tick_rate': tick_rate,
+            'tick': self._next_tick()
         }
     
-    def player_input(self, player_number, input_data):
-        """Enviar input de jugador"""
+    def player_input(self, player_number, input_data, seq=None):
+        """
+        Enviar input de jugador
+        seq es el tick del mensaje original del cliente cuando el servidor lo reenvía
+        (el host lo confirma en sus estados para la predicción del cliente)
+        """
         return {
             'type': self.MSG_PLAYER_INPUT,
             'player_number': player_number,
             'input': input_data,
-            'timestamp': self._get_timestamp()
+            'seq': seq,
+            'tick': self._next_tick()
+        }
+    
+    def player_inputs(self, player_number, inputs):
+        """Últimos inputs del jugador como (seq, input), para el canal UDP (redundancia)"""
+        return {
+            'type': self.MSG_PLAYER_INPUTS,
+            'player_number': player_number,
+            'inputs': list(inputs),
+            'tick': self._next_tick()
+        }
+    
+    def udp_request(self):
+        """Pedir al servidor un canal UDP para estados e inputs"""
+        return {
+            'type': self.MSG_UDP_REQUEST,
+            'tick': self._next_tick()
+        }
+    
+    def list_rooms(self):
+        """Pedir al servidor la lista de salas"""
+        return {
+            'type': self.MSG_LIST_ROOMS,
+            'tick': self._next_tick()
+        }
+    
+    def room_list(self, rooms):
+        """Salas del servidor: room_id, name, players, max_players y game_state de cada una"""
+        return {
+            'type': self.MSG_ROOM_LIST,
+            'rooms': list(rooms),
+            'tick': self._next_tick()
+        }
+    
+    def create_room(self, name, max_players=MAX_PLAYERS):
+        """Crear una sala (o unirse a la que ya tenga ese nombre)"""
+        return {
+            'type': self.MSG_CREATE_ROOM,
+            'name': name,
+            'max_players': max_players,
+            'tick': self._next_tick()
+        }
+    
+    def join_room(self, room_id):
+        """Unirse a una sala existente"""
+        return {
+            'type': self.MSG_JOIN_ROOM,
+            'room_id': room_id,
+            'tick': self._next_tick()
+        }
+    
+    def room_joined(self, room_id, name):
+        """Confirmar al cliente la sala a la que entró"""
+        return {
+            'type': self.MSG_ROOM_JOINED,
+            'room_id': room_id,
+            'name': name,
+            'tick': self._next_tick()
+        }
+    
+    def udp_token(self, token):
+        """Token con el que el cliente se identifica en el canal UDP"""
+        return {
+            'type': self.MSG_UDP_TOKEN,
+            'token': token,
+            'tick': self._next_tick()
+        }
+    
+    def udp_hello(self, player_number, token):
+        """Abrir el canal UDP (cliente) o confirmarlo (servidor)"""
+        return {
+            'type': self.MSG_UDP_HELLO,
+            'player_number': player_number,
+            'token': token,
+            'tick': self._next_tick()
         }
     
     def player_name(self, player_number, name):
@@ -79,7 +221,7 @@ class GameProtocol:
             'type': self.MSG_PLAYER_NAME,
             'player_number': player_number,
             'name': name,
-            'timestamp': self._get_timestamp()
+            'tick': self._next_tick()
         }
     
     def player_name_update(self, player_number, name):
@@ -88,7 +230,7 @@ class GameProtocol:
             'type': self.MSG_PLAYER_NAME_UPDATE,
             'player_number': player_number,
             'name': name,
-            'timestamp': self._get_timestamp()
+            'tick': self._next_tick()
         }
     
     def game_state(self, game_state):
@@ -96,16 +238,179 @@ class GameProtocol:
         return {
             'type': self.MSG_GAME_STATE,
             'state': self._serialize_game_state(game_state),
-            'timestamp': self._get_timestamp()
+            'tick': self._next_tick()
         }
     
-    def game_state_update(self, game_state):
+    def game_state_update(self, game_state, sim_tick=None, acks=None):
         """Enviar actualización del estado del juego"""
         return {
             'type': self.MSG_GAME_STATE_UPDATE,
             'state': self._serialize_game_state(game_state),
-            'timestamp': self._get_timestamp()
+            'sim_tick': sim_tick,
+            'acks': acks or {},
+            'tick': self._next_tick()
+        }
+    
+    def game_state_delta(self, snapshot_id, baseline_id, delta, sim_tick=None, acks=None):
+        """Enviar solo los cambios respecto a un snapshot anterior"""
+        return {
+            'type': self.MSG_GAME_STATE_DELTA,
+            'snapshot_id': snapshot_id,
+            'baseline_id': baseline_id,
+            'delta': delta,
+            'sim_tick': sim_tick,
+            'acks': acks or {},
+            'tick': self._next_tick()
+        }
+    
+    def game_state_snapshot(self, game_state, keyframe=False, keyframe_type=MSG_GAME_STATE):
+        """
+        Serializar el estado del juego como keyframe o como delta
+        Devuelve un mensaje completo (keyframe_type) cada KEYFRAME_INTERVAL snapshots
+        (o cuando cambia la fase del juego o el conjunto de serpientes) y 'game_state_delta' en el resto
+        Ambos llevan el tick de la simulación y los inputs confirmados por jugador
+        """
+        current = self._serialize_game_state(game_state)
+        if current is None:
+            return self.game_state(None)
+        sim_tick, acks = self._simulation_sync(game_state)
+        
+        with self._snapshot_lock:
+            previous = self._sent_snapshot
+            self._snapshot_id += 1
+            current['snapshot_id'] = self._snapshot_id
+            self._sent_snapshot = current
+        
+        keyframe = (keyframe or previous is None
+                    or current['snapshot_id'] % KEYFRAME_INTERVAL == 0
+                    or previous['game_state'] != current['game_state']
+                    or previous['game_mode'] != current['game_mode']
+                    # Un delta no puede quitar serpientes: si cambia el conjunto, estado completo
+                    or previous.get('snakes', {}).keys() != current.get('snakes', {}).keys())
+        if keyframe:
+            return {
+                'type': keyframe_type,
+                'state': current,
+                'sim_tick': sim_tick,
+                'acks': acks,
+                'tick': self._next_tick()
+            }
+        return self.game_state_delta(current['snapshot_id'], previous['snapshot_id'],
+                                     self._diff_snapshots(previous, current), sim_tick, acks)
+    
+    def _simulation_sync(self, game_state):
+        """
+        Tick de la simulación autoritativa y, por jugador, el último input aplicado
+        como (seq, tick en que se aplicó); sin simulación el tick es None
+        """
+        simulation = getattr(game_state, 'simulation', None)
+        sim_tick = simulation.tick if simulation is not None else None
+        return sim_tick, dict(getattr(game_state, 'input_acks', None) or {})
+    
+    def request_keyframe(self):
+        """Forzar que el próximo snapshot se envíe completo"""
+        with self._snapshot_lock:
+            self._sent_snapshot = None
+    
+    def reset_received_state(self):
+        """Olvidar los estados recibidos (otra sala numera sus snapshots desde cero)"""
+        with self._snapshot_lock:
+            self._received_snapshot = None
+            self._latest_snapshot_id = 0
+    
+    def _diff_snapshots(self, previous, current):
+        """Calcular los cambios entre dos estados serializados"""
+        delta = {
+            'game_state': current['game_state'],
+            'countdown': current['countdown'],
+            'winner': current['winner'],
+            'snakes': {}
         }
+        
+        previous_snakes = previous.get('snakes', {})
+        for player_num, snake in current.get('snakes', {}).items():
+            delta['snakes'][player_num] = self._diff_snake(previous_snakes.get(player_num), snake)
+        
+        for key in ('fruit', 'mine', 'players'):
+            if current.get(key) != previous.get(key):
+                delta[key] = current.get(key)
+        
+        return delta
+    
+    def _diff_snake(self, previous, current):
+        """
+        Describir el movimiento de una serpiente como cabezas añadidas y colas retiradas
+        Si el cuerpo no se puede derivar del anterior se envía completo
+        """
+        body = current['body']
+        ops = {'new_block': current['new_block']}
+        if current['direction'] != (previous or {}).get('direction'):
+            ops['direction'] = current['direction']
+        
+        if previous is None or not previous['body']:
+            ops['body'] = body
+            return ops
+        
+        old_body = previous['body']
+        # Nuevas cabezas: bloques anteriores a la antigua cabeza
+        pushed = 0
+        while pushed < len(body) and body[pushed] != old_body[0]:
+            pushed += 1
+            if pushed > 2:  # Más de dos bloques nuevos: no es un movimiento normal
+                break
+        popped = len(old_body) + pushed - len(body)
+        
+        if pushed <= 2 and 0 <= popped <= len(old_body) and body[pushed:] == old_body[:len(old_body) - popped]:
+            if pushed:
+                ops['push'] = body[:pushed]
+            if popped:
+                ops['pop'] = popped
+        else:
+            ops['body'] = body
+        return ops
+    
+    def apply_state_delta(self, message):
+        """
+        Reconstruir el estado completo a partir de un delta
+        Devuelve None si el delta no corresponde al último snapshot recibido
+        (el cliente espera al siguiente keyframe para resincronizarse)
+        """
+        baseline = self._received_snapshot
+        if baseline is None or baseline.get('snapshot_id') != message['baseline_id']:
+            return None
+        
+        delta = message['delta']
+        state = dict(baseline)
+        state['snapshot_id'] = message['snapshot_id']
+        state['game_state'] = delta['game_state']
+        state['countdown'] = delta['countdown']
+        state['winner'] = delta['winner']
+        
+        state['snakes'] = dict(baseline.get('snakes', {}))
+        state['scores'] = dict(baseline.get('scores', {}))
+        for player_num, ops in delta['snakes'].items():
+            snake = dict(state['snakes'].get(player_num) or {'body': [], 'direction': None, 'new_block': False})
+            if 'body' in ops:
+                snake['body'] = ops['body']
+            else:
+                body = snake['body']
+                popped = ops.get('pop', 0)
+                snake['body'] = list(ops.get('push', ())) + (body[:len(body) - popped] if popped else body)
+            if 'direction' in ops:
+                snake['direction'] = ops['direction']
+            snake['new_block'] = ops['new_block']
+            state['snakes'][player_num] = snake
+            state['scores'][player_num] = len(snake['body']) - 3
+        
+        for key in ('fruit', 'mine', 'players'):
+            if key in delta:
+                if delta[key] is None:
+                    state.pop(key, None)
+                else:
+                    state[key] = delta[key]
+        
+        self._received_snapshot = state
+        return state
     
     def game_over(self, winner, scores):
         """Notificar fin del juego"""
@@ -113,7 +418,7 @@ class GameProtocol:
             'type': self.MSG_GAME_OVER,
             'winner': winner,
             'scores': scores,
-            'timestamp': self._get_timestamp()
+            'tick': self._next_tick()
         }
     
     def player_disconnected(self, player_number):
@@ -121,7 +426,7 @@ class GameProtocol:
         return {
             'type': self.MSG_PLAYER_DISCONNECTED,
             'player_number': player_number,
-            'timestamp': self._get_timestamp()
+            'tick': self._next_tick()
         }
     
     def error(self, error_message):
@@ -129,7 +434,7 @@ class GameProtocol:
         return {
             'type': self.MSG_ERROR,
             'message': error_message,
-            'timestamp': self._get_timestamp()
+            'tick': self._next_tick()
         }
     
     def _serialize_game_state(self, game_state):
@@ -139,6 +444,10 @@ class GameProtocol:
         """
         if not game_state:
             return None
+        
+        # El host ya envía el estado serializado: no volver a procesarlo
+        if isinstance(game_state, dict):
+            return game_state
             
         serialized = {}
         
@@ -147,6 +456,7 @@ class GameProtocol:
         serialized['game_mode'] = getattr(game_state, 'game_mode', 'multiplayer')
         serialized['countdown'] = getattr(game_state, 'countdown', 0)
         serialized['winner'] = getattr(game_state, 'winner', None)
+        serialized['snapshot_id'] = 0
         
         # Serializar serpientes (hasta 5)
         serialized['snakes'] = {}
@@ -181,7 +491,8 @@ class GameProtocol:
         # Información de jugadores
         serialized['players'] = {}
         if hasattr(game_state, 'player_names'):
-            serialized['players'] = game_state.player_names
+            # Copia: con el diccionario vivo el snapshot anterior cambiaría también y el delta no vería el cambio
+            serialized['players'] = dict(game_state.player_names)
         
         return serialized
     
@@ -191,21 +502,25 @@ class GameProtocol:
             return None
             
         return {
-            'body': [self._vector_to_dict(pos) for pos in snake.body],
+            'body': list(snake.body),
             'direction': self._vector_to_dict(snake.direction),
             'new_block': getattr(snake, 'new_block', False)
         }
     
     def _vector_to_dict(self, vector):
-        """Convertir Vector2 a diccionario"""
+        """Convertir una posición (x, y) o Vector2 a diccionario"""
+        if isinstance(vector, (tuple, list)) and len(vector) == 2:
+            return {'x': vector[0], 'y': vector[1]}
         if hasattr(vector, 'x') and hasattr(vector, 'y'):
             return {'x': vector.x, 'y': vector.y}
         return vector
     
-    def _dict_to_vector(self, vector_dict):
-        """Convertir diccionario a Vector2"""
+    def _dict_to_point(self, vector_dict):
+        """Convertir diccionario o secuencia a una posición (x, y) de enteros"""
         if isinstance(vector_dict, dict) and 'x' in vector_dict and 'y' in vector_dict:
-            return Vector2(vector_dict['x'], vector_dict['y'])
+            return (int(vector_dict['x']), int(vector_dict['y']))
+        if isinstance(vector_dict, (tuple, list)) and len(vector_dict) == 2:
+            return (int(vector_dict[0]), int(vector_dict[1]))
         return vector_dict
     
     def deserialize_game_state(self, serialized_state, game_instance=None):
@@ -228,17 +543,31 @@ class GameProtocol:
         """Actualizar instancia del juego con datos serializados"""
         try:
             # Actualizar estado básico
+            previous_state = getattr(game_instance, 'game_state', None)
             game_instance.game_state = serialized_state.get('game_state', 'playing')
             game_instance.countdown = serialized_state.get('countdown', 0)
             game_instance.winner = serialized_state.get('winner', None)
             
-            # Actualizar serpientes
+            # Actualizar serpientes (la del jugador local se reconcilia con su predicción)
             snakes_data = serialized_state.get('snakes', {})
+            predictor = self._active_predictor(game_instance, serialized_state)
+            if hasattr(game_instance, 'set_active_players'):
+                # Las serpientes que no están en la partida no se dibujan
+                game_instance.set_active_players(snakes_data)
             
             for player_num in range(1, 6):  # Jugadores 1-5
-                if player_num in snakes_data and hasattr(game_instance, 'snakes') and player_num in game_instance.snakes:
-                    self._update_snake(game_instance.snakes[player_num], snakes_data[player_num])
-            
+                if player_num in snakes_data and hasattr(game_instance, 'snakes') and game_instance.snakes.get(player_num):
+                    if predictor and player_num == predictor.player_number:
+                        self._reconcile_snake(predictor, game_instance.snakes[player_num],
+                                              snakes_data[player_num], serialized_state)
+                    else:
+                        self._update_snake(game_instance.snakes[player_num], snakes_data[player_num])
+
+            # Los cuerpos se reemplazaron completos: reconstruir la rejilla de ocupación
+            simulation = getattr(game_instance, 'simulation', None)
+            if simulation is not None:
+                simulation.rebuild_grid()
+
             # Actualizar nombres de jugadores
             players_data = serialized_state.get('players', {})
             if hasattr(game_instance, 'player_names'):
@@ -249,20 +578,47 @@ class GameProtocol:
             # Actualizar fruta
             fruit_data = serialized_state.get('fruit')
             if fruit_data and hasattr(game_instance, 'fruit') and game_instance.fruit:
-                game_instance.fruit.pos = self._dict_to_vector(fruit_data['pos'])
-                game_instance.fruit.x = fruit_data['x']
-                game_instance.fruit.y = fruit_data['y']
+                game_instance.fruit.place(self._dict_to_point(fruit_data['pos']))
             
             # Actualizar mina
             mine_data = serialized_state.get('mine')
             if mine_data and hasattr(game_instance, 'mine') and game_instance.mine:
-                game_instance.mine.pos = self._dict_to_vector(mine_data['pos'])
-                game_instance.mine.x = mine_data['x']
-                game_instance.mine.y = mine_data['y']
+                game_instance.mine.place(self._dict_to_point(mine_data['pos']))
+            
+            if game_instance.game_state == 'game_over':
+                self._notify_game_over(game_instance, previous_state)
                 
         except Exception as e:
             print(f"❌ Error actualizando instancia del juego: {e}")
     
+    def _active_predictor(self, game_instance, serialized_state):
+        """Predictor de la serpiente local, solo mientras se juega con estados numerados por tick"""
+        predictor = getattr(game_instance, 'predictor', None)
+        if predictor is None:
+            return None
+        if serialized_state.get('game_state') != 'playing' or serialized_state.get('sim_tick') is None:
+            predictor.reset()
+            return None
+        return predictor
+    
+    def _reconcile_snake(self, predictor, snake, snake_data, serialized_state):
+        """Corregir la serpiente predicha con el estado autoritativo del host"""
+        if not snake_data or not snake_data.get('body'):
+            return
+        try:
+            fruit_data = serialized_state.get('fruit')
+            predictor.reconcile(
+                snake,
+                [self._dict_to_point(pos) for pos in snake_data['body']],
+                self._dict_to_point(snake_data['direction']),
+                snake_data.get('new_block', False),
+                serialized_state['sim_tick'],
+                serialized_state.get('acks', {}).get(predictor.player_number),
+                self._dict_to_point(fruit_data['pos']) if fruit_data else None
+            )
+        except Exception as e:
+            print(f"❌ Error reconciliando la predicción: {e}")
+    
     def _update_snake(self, snake, snake_data):
         """Actualizar una serpiente con datos serializados"""
         if not snake_data:
@@ -271,11 +627,11 @@ class GameProtocol:
         try:
             # Actualizar cuerpo
             if 'body' in snake_data and snake_data['body']:
-                snake.body = [self._dict_to_vector(pos) for pos in snake_data['body']]
+                snake.body = deque(self._dict_to_point(pos) for pos in snake_data['body'])
             
             # Actualizar dirección
             if 'direction' in snake_data and snake_data['direction']:
-                direction = self._dict_to_vector(snake_data['direction'])
+                direction = self._dict_to_point(snake_data['direction'])
                 snake.direction = direction
             
             # Actualizar estado de nuevo bloque
@@ -285,13 +641,13 @@ class GameProtocol:
         except Exception as e:
             print(f"❌ Error actualizando serpiente: {e}")
     
-    def _get_timestamp(self):
-        """Obtener timestamp actual"""
-        return datetime.now().isoformat()
+    def _next_tick(self):
+        """Obtener el siguiente número de secuencia (monotónico) de mensaje"""
+        return next(self._ticks)
     
     def validate_message(self, message):
         """Validar estructura del mensaje"""
-        required_fields = ['type', 'timestamp']
+        required_fields = ['type', 'tick']
         
         if not isinstance(message, dict):
             return False
@@ -303,13 +659,67 @@ class GameProtocol:
         return True
     
     def process_network_messages(self, game_instance):
-        """Procesar mensajes de red para una instancia de juego"""
+        """
+        Procesar mensajes de red para una instancia de juego
+        De cada racha de estados solo se aplica al juego el más reciente:
+        los anteriores solo avanzan la cadena de deltas (operaciones sobre
+        diccionarios), así ponerse al día tras un bloqueo cuesta una sola
+        actualización en vez de N
+        """
         if not hasattr(game_instance, 'client') or not game_instance.client:
             return
             
-        messages = game_instance.client.get_messages()
+        messages = game_instance.client.get_messages(INBOX_DRAIN_LIMIT)
+        pending_state = None
         for message in messages:
+            if message.get('type') in (self.MSG_GAME_STATE_UPDATE, self.MSG_GAME_STATE_DELTA):
+                state = self.receive_state(message)
+                if state is not None:
+                    pending_state = state
+                continue
+            
+            # Otro tipo de mensaje: aplicar antes el estado pendiente para respetar el orden
+            if pending_state is not None:
+                self.deserialize_game_state(pending_state, game_instance)
+                pending_state = None
             self._process_single_message(game_instance, message)
+        
+        if pending_state is not None:
+            self.deserialize_game_state(pending_state, game_instance)
+    
+    def receive_state(self, message):
+        """
+        Reconstruir el estado de un mensaje 'game_state_update' o 'game_state_delta'
+        Devuelve None si el snapshot es anterior (o igual) al último recibido,
+        o si el delta no corresponde a nuestra base
+        """
+        with self._snapshot_lock:
+            return self._receive_state(message)
+    
+    def _receive_state(self, message):
+        if message['type'] == self.MSG_GAME_STATE_DELTA:
+            snapshot_id = message['snapshot_id']
+        else:
+            snapshot_id = (message.get('state') or {}).get('snapshot_id', 0)
+        
+        # snapshot_id 0: estado sin numerar (envío directo), siempre se acepta
+        if snapshot_id and snapshot_id <= self._latest_snapshot_id:
+            return None
+        
+        if message['type'] == self.MSG_GAME_STATE_DELTA:
+            state = self.apply_state_delta(message)
+        else:
+            # Un estado completo es la nueva base para los deltas siguientes
+            state = message['state']
+            self._received_snapshot = state
+        
+        if state is not None:
+            # Datos para reconciliar la predicción local (no forman parte de la base de deltas)
+            state['sim_tick'] = message.get('sim_tick')
+            state['acks'] = message.get('acks') or {}
+            if snapshot_id:
+                self._latest_snapshot_id = snapshot_id
+        return state
     
     def _process_single_message(self, game_instance, message):
         """Procesar un solo mensaje de red"""
@@ -319,15 +729,42 @@ class GameProtocol:
             # Aplicar input de jugador remoto
             player_num = message['player_number']
             input_data = message['input']
-            self._apply_remote_input(game_instance, player_num, input_data)
+            self._apply_remote_input(game_instance, player_num, input_data, message.get('seq'))
+            
+        elif msg_type == self.MSG_ASSIGN_PLAYER:
+            # Número de jugador asignado por el servidor
+            if hasattr(game_instance, 'assign_player'):
+                game_instance.assign_player(message['player_number'])
             
         elif msg_type == self.MSG_GAME_STATE_UPDATE:
-            # Actualizar estado del juego desde el host
-            if not getattr(game_instance, 'is_host', True):  # Los clientes reciben el estado
-                self.deserialize_game_state(message['state'], game_instance)
+            # Actualizar estado del juego desde el servidor
+            state = self.receive_state(message)
+            if state is not None:
+                self.deserialize_game_state(state, game_instance)
+                
+        elif msg_type == self.MSG_GAME_STATE_DELTA:
+            # Aplicar cambios sobre el último estado recibido
+            state = self.receive_state(message)
+            if state is not None:
+                self.deserialize_game_state(state, game_instance)
+                
+        elif msg_type == self.MSG_ROOM_LIST:
+            # Servidor con salas: elegir una
+            if hasattr(game_instance, 'choose_room'):
+                game_instance.choose_room(message['rooms'])
+                
+        elif msg_type == self.MSG_ERROR:
+            if hasattr(game_instance, 'show_error'):
+                game_instance.show_error(message['message'])
                 
+        elif msg_type == self.MSG_ROOM_JOINED:
+            # Nueva sala: sus estados no encadenan con los de la anterior
+            self.reset_received_state()
+            
         elif msg_type == self.MSG_GAME_START:
-            # Iniciar juego
+            # Iniciar juego al ritmo de ticks del servidor
+            if message.get('tick_rate') and hasattr(game_instance, 'set_tick_rate'):
+                game_instance.set_tick_rate(message['tick_rate'])
             if hasattr(game_instance, 'start_countdown'):
                 game_instance.start_countdown()
                 
@@ -345,12 +782,24 @@ class GameProtocol:
                 
         elif msg_type == self.MSG_GAME_OVER:
             # Fin del juego
+            previous_state = game_instance.game_state
             game_instance.game_state = 'game_over'
             game_instance.winner = message['winner']
+            self._notify_game_over(game_instance, previous_state)
+    
+    def _notify_game_over(self, game_instance, previous_state):
+        """Avisar al juego una sola vez cuando la partida del servidor termina"""
+        if previous_state != 'game_over' and hasattr(game_instance, 'game_over'):
+            game_instance.game_over(game_instance.winner)
     
-    def _apply_remote_input(self, game_instance, player_number, input_data):
+    def _apply_remote_input(self, game_instance, player_number, input_data, seq=None):
         """Aplicar input de jugador remoto"""
         try:
+            # El eco de nuestro propio input ya está en la predicción local
+            predictor = getattr(game_instance, 'predictor', None)
+            if predictor and predictor.player_number == player_number:
+                return
+            
             # Determinar qué serpiente controla el jugador remoto
             if hasattr(game_instance, 'snakes') and player_number in game_instance.snakes:
                 snake = game_instance.snakes[player_number]
@@ -358,15 +807,8 @@ class GameProtocol:
                 if not snake:
                     return
                     
-                # Aplicar dirección según input
-                if input_data == 'up' and snake.direction.y != 1:
-                    snake.direction = Vector2(0, -1)
-                elif input_data == 'down' and snake.direction.y != -1:
-                    snake.direction = Vector2(0, 1)
-                elif input_data == 'right' and snake.direction.x != -1:
-                    snake.direction = Vector2(1, 0)
-                elif input_data == 'left' and snake.direction.x != 1:
-                    snake.direction = Vector2(-1, 0)
+                # Aplicar dirección según input (sin permitir dar media vuelta)
+                snake.turn(input_data)
                     
         except Exception as e:
             print(f"❌ Error aplicando input remoto: {e}")
\ No newline at end of file
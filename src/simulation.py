@@ -0,0 +1,361 @@
+import random
+from collections import deque
+from src.constants import CELL_NUMBER
+
+# Headless game rules shared by local games, the multiplayer host and the server.
+# Nothing in here may import pygame: positions are plain (x, y) integer tuples.
+
+DIRECTIONS = {
+    'up': (0, -1),
+    'down': (0, 1),
+    'left': (-1, 0),
+    'right': (1, 0),
+}
+
+# Head position and heading of each player's snake at the start of a round
+START_POSITIONS = {
+    1: ((3, 10), (1, 0)),
+    2: ((22, 10), (-1, 0)),
+    3: ((3, 20), (1, 0)),
+    4: ((22, 20), (-1, 0)),
+    5: ((12, 15), (0, -1)),
+}
+
+START_LENGTH = 3
+
+
+def is_hud_cell(cell, cell_number=CELL_NUMBER):
+    """Cells hidden behind the score boxes (top two rows, three columns per side)"""
+    x, y = cell
+    return y < 2 and (x < 3 or x >= cell_number - 3)
+
+
+class SnakeState:
+    """
+    Snake body and heading without any graphics; body[0] is the head.
+    The body is a deque so moving pushes the head and pops the tail in O(1)
+    instead of shifting (or copying) the whole list every tick.
+    """
+
+    def __init__(self, start_position=None, player_number=1, direction=None):
+        self.player_number = player_number
+        self._initialize(start_position, player_number, direction)
+
+    def _initialize(self, start_position, player_number, direction=None):
+        default_position, default_direction = START_POSITIONS.get(player_number, START_POSITIONS[1])
+        x, y = start_position or default_position
+        dx, dy = direction or default_direction
+        # The body trails behind the head, opposite to the heading
+        self.body = deque((x - dx * i, y - dy * i) for i in range(START_LENGTH))
+        self.direction = (dx, dy)
+        self.new_block = False
+        self.alive = True
+
+    @property
+    def score(self):
+        return len(self.body) - START_LENGTH
+
+    def turn(self, input_name):
+        """Change heading from an input name ('up', 'down', ...); reversing is ignored"""
+        new_direction = DIRECTIONS.get(input_name)
+        if new_direction is None:
+            return False
+        if new_direction[0] == -self.direction[0] and new_direction[1] == -self.direction[1]:
+            return False
+        self.direction = new_direction
+        return True
+
+    def move_snake(self):
+        """Push the new head; returns the tail cell that was dropped, or None when growing"""
+        head_x, head_y = self.body[0]
+        self.body.appendleft((head_x + self.direction[0], head_y + self.direction[1]))
+        if self.new_block:
+            self.new_block = False
+            return None
+        return self.body.pop()
+
+    def add_block(self):
+        self.new_block = True
+
+    def reset(self, start_position=None, player_number=None, direction=None):
+        if player_number is not None:
+            self.player_number = player_number
+        self._initialize(start_position, self.player_number, direction)
+
+
+class GridItem:
+    """Single-cell board item (fruit or mine)"""
+
+    def __init__(self):
+        self.randomize()
+
+    def randomize(self, rng=random):
+        self.place((rng.randint(0, CELL_NUMBER - 1), rng.randint(0, CELL_NUMBER - 1)))
+
+    def place(self, cell):
+        self.x, self.y = cell
+        self.pos = (self.x, self.y)
+
+
+class GameSimulation:
+    """
+    Authoritative snake rules for any number of players.
+
+    Collisions use an occupancy grid: one byte per cell holding the player
+    number of the snake on it (0 when empty). It is updated incrementally
+    as heads are pushed and tails popped, so every collision test is a
+    single lookup no matter how long the snakes get. Call rebuild_grid()
+    after replacing snake bodies from outside the simulation.
+
+    The empty cells outside the HUD corners are also kept in a list with a
+    reverse index (swap-remove), so picking a random free cell for the
+    fruit or the mine is O(1) even when the board is nearly full.
+
+    step() advances exactly one tick and returns the events it produced,
+    e.g. ('crunch', player), ('boom', player), ('hiss', player) or
+    ('game_over', winner). The caller decides what to do with them (play a
+    sound, update the database, notify clients). winner is a player number,
+    0 for a tie, or None when a single-player game ends.
+    """
+
+    def __init__(self, players=(1,), snakes=None, fruit=None, mine=None,
+                 cell_number=CELL_NUMBER, seed=None):
+        self.cell_number = cell_number
+        self.rng = random.Random(seed)
+        if snakes is None:
+            snakes = {player: SnakeState(player_number=player) for player in players}
+        self.snakes = snakes
+        self.fruit = fruit if fruit is not None else GridItem()
+        self.mine = mine if mine is not None else GridItem()
+        self.tick = 0
+        self.game_state = 'playing'
+        self.winner = None
+        self.grid = bytearray(cell_number * cell_number)
+        self._free_cells = []
+        self._free_slots = [-1] * (cell_number * cell_number)
+        self._heads = {}
+        self.rebuild_grid()
+        self.spawn_items()
+
+    @property
+    def single_player(self):
+        return len(self.snakes) == 1
+
+    def living_snakes(self):
+        return [snake for snake in self.snakes.values() if snake and snake.alive]
+
+    def reset(self):
+        """Put every snake back on its start position and start a new round"""
+        for snake in self.snakes.values():
+            if snake:
+                snake.reset()
+        self.tick = 0
+        self.game_state = 'playing'
+        self.winner = None
+        self.rebuild_grid()
+        self.spawn_items()
+
+    def apply_input(self, player_number, input_name):
+        snake = self.snakes.get(player_number)
+        if snake and snake.alive:
+            return snake.turn(input_name)
+        return False
+
+    def step(self, inputs=()):
+        """Advance one tick after applying (player_number, input_name) pairs"""
+        events = []
+        if self.game_state != 'playing':
+            return events
+
+        for player_number, input_name in inputs:
+            self.apply_input(player_number, input_name)
+
+        living = self.living_snakes()
+        heads = self._heads = {}
+        for snake in living:
+            tail = snake.move_snake()
+            if tail is not None:
+                self._clear_cell(tail, snake.player_number)
+            heads.setdefault(snake.body[0], []).append(snake.player_number)
+        self.tick += 1
+
+        dead = self._check_items(living, events)
+        dead.update(self._check_collisions(living, events))
+        self._place_heads(living)
+        self._heads = {}
+        if dead:
+            self._resolve_deaths(living, dead, events)
+        return events
+
+    # Occupancy grid
+
+    def _cell_index(self, cell):
+        x, y = cell
+        if 0 <= x < self.cell_number and 0 <= y < self.cell_number:
+            return y * self.cell_number + x
+        return None
+
+    def rebuild_grid(self):
+        """
+        Fill the grid from the snake bodies. Dead snakes are written last so
+        that a head buried in another body keeps its cell blocked after the
+        living snake's tail moves on.
+        """
+        grid = self.grid
+        grid[:] = bytes(len(grid))
+        snakes = [snake for snake in self.snakes.values() if snake]
+        snakes.sort(key=lambda snake: not snake.alive)
+        for snake in snakes:
+            for cell in snake.body:
+                index = self._cell_index(cell)
+                if index is not None:
+                    grid[index] = snake.player_number
+
+        cell_number = self.cell_number
+        self._free_cells = [
+            index for index in range(len(grid))
+            if not grid[index] and not is_hud_cell((index % cell_number, index // cell_number), cell_number)
+        ]
+        self._free_slots = [-1] * len(grid)
+        for slot, index in enumerate(self._free_cells):
+            self._free_slots[index] = slot
+
+    def _clear_cell(self, cell, player_number):
+        index = self._cell_index(cell)
+        if index is not None and self.grid[index] == player_number:
+            self.grid[index] = 0
+            if not is_hud_cell(cell, self.cell_number):
+                self._free_slots[index] = len(self._free_cells)
+                self._free_cells.append(index)
+
+    def _place_heads(self, snakes):
+        for snake in snakes:
+            index = self._cell_index(snake.body[0])
+            if index is not None and not self.grid[index]:
+                self.grid[index] = snake.player_number
+                self._take_free_slot(index)
+
+    def _take_free_slot(self, index):
+        """Swap-remove a cell from the free list (no-op for HUD cells)"""
+        slot = self._free_slots[index]
+        if slot < 0:
+            return
+        last = self._free_cells.pop()
+        if last != index:
+            self._free_cells[slot] = last
+            self._free_slots[last] = slot
+        self._free_slots[index] = -1
+
+    # Items
+
+    def spawn_items(self):
+        self.spawn_fruit()
+        self.spawn_mine()
+
+    def spawn_fruit(self):
+        cell = self._random_free_cell(exclude=(self.mine.pos,))
+        if cell is not None:
+            self.fruit.place(cell)
+
+    def spawn_mine(self):
+        cell = self._random_free_cell(exclude=(self.fruit.pos,))
+        if cell is not None:
+            self.mine.place(cell)
+
+    def is_free_cell(self, cell):
+        if is_hud_cell(cell, self.cell_number):
+            return False
+        index = self._cell_index(cell)
+        return index is not None and not self.grid[index] and cell not in self._heads
+
+    def _random_free_cell(self, exclude=()):
+        """
+        Uniform pick from the free list. Only the other item and this tick's
+        new heads (not on the grid yet) can be rejected, so a few tries are
+        enough; when they all fail the remaining cells are scanned instead.
+        Returns None if the board is full, leaving the item where it was.
+        """
+        free_cells = self._free_cells
+        cell_number = self.cell_number
+        for _ in range(8):
+            if not free_cells:
+                return None
+            index = free_cells[self.rng.randrange(len(free_cells))]
+            cell = (index % cell_number, index // cell_number)
+            if cell not in exclude and cell not in self._heads:
+                return cell
+
+        candidates = [(index % cell_number, index // cell_number) for index in free_cells]
+        candidates = [cell for cell in candidates if cell not in exclude and cell not in self._heads]
+        return self.rng.choice(candidates) if candidates else None
+
+    def _check_items(self, living, events):
+        """Handle fruit and mines; returns the snakes killed by a mine"""
+        dead = set()
+        for snake in living:
+            if snake.body[0] == self.fruit.pos:
+                snake.add_block()
+                events.append(('crunch', snake.player_number))
+                self.spawn_fruit()
+
+        for snake in living:
+            if snake.body[0] == self.mine.pos:
+                events.append(('boom', snake.player_number))
+                if len(snake.body) >= START_LENGTH + 2:
+                    self._clear_cell(snake.body.pop(), snake.player_number)
+                    self._clear_cell(snake.body.pop(), snake.player_number)
+                elif len(snake.body) == START_LENGTH + 1:
+                    self._clear_cell(snake.body.pop(), snake.player_number)
+                else:
+                    dead.add(snake.player_number)
+                self.spawn_mine()
+        return dead
+
+    # Collisions
+
+    def _check_collisions(self, living, events):
+        """
+        Return the players whose head hit a wall, itself or another snake.
+        New heads are not on the grid yet, so the grid only holds bodies and
+        head-on crashes are found through the heads of this tick.
+        """
+        dead = set()
+        for snake in living:
+            player_number = snake.player_number
+            head = snake.body[0]
+            index = self._cell_index(head)
+            if index is None:
+                dead.add(player_number)
+                continue
+
+            owner = self.grid[index]
+            if owner == player_number:
+                dead.add(player_number)
+            elif owner or len(self._heads[head]) > 1:
+                events.append(('hiss', player_number))
+                dead.add(player_number)
+        return dead
+
+    def _resolve_deaths(self, living, dead, events):
+        for player_number in dead:
+            self.snakes[player_number].alive = False
+        self.rebuild_grid()
+
+        if self.single_player:
+            self._game_over(None, events)
+            return
+
+        survivors = [snake for snake in living if snake.alive]
+        if len(survivors) == 1:
+            self._game_over(survivors[0].player_number, events)
+        elif not survivors:
+            # Everyone left died on the same tick: the longest snake wins
+            scores = {player: self.snakes[player].score for player in dead}
+            best = max(scores.values())
+            winners = [player for player, score in scores.items() if score == best]
+            self._game_over(winners[0] if len(winners) == 1 else 0, events)
+
+    def _game_over(self, winner, events):
+        self.game_state = 'game_over'
+        self.winner = winner
+        events.append(('game_over', winner))
@@ -0,0 +1,240 @@
+import pygame
+import os
+import threading
+from collections import OrderedDict
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSETS_DIR = os.path.join(BASE_DIR, "..", "assets")
+
+SNAKE_PARTS = (
+    "head_up", "head_down", "head_right", "head_left",
+    "tail_up", "tail_down", "tail_right", "tail_left",
+    "body_vertical", "body_horizontal",
+    "body_tr", "body_tl", "body_br", "body_bl",
+)
+SNAKE_SOUNDS = ("crunch.wav", "boom11.wav", "snake_hiss.wav")
+ATLAS_WIDTH = 640
+GAME_FONT = os.path.join(ASSETS_DIR, "Font", "PoetsenOne-Regular.ttf")
+TEXT_CACHE_SIZE = 256
+
+
+def graphics_path(*parts):
+    return os.path.join(ASSETS_DIR, "graphics", *parts)
+
+
+def sound_path(name):
+    return os.path.join(ASSETS_DIR, "Sound", name)
+
+
+def game_asset_paths(players=range(1, 6)):
+    """Image and sound paths used by a match with the given players"""
+    images = [graphics_path("apple.png"), graphics_path("mine.png")]
+    for player_number in players:
+        images.extend(graphics_path(f"player{player_number}", f"{part}.png") for part in SNAKE_PARTS)
+    sounds = [sound_path(name) for name in SNAKE_SOUNDS]
+    return images, sounds
+
+
+class SpriteAtlas:
+    """
+    Many sprites packed into one surface (simple shelf packing, row by row).
+    Drawing code blits the atlas with a source area, so all snakes, the
+    fruit and the mine share a single texture and can go through one
+    Surface.blits() call.
+    """
+
+    def __init__(self, images, width=ATLAS_WIDTH):
+        self.regions = {}
+        x = y = row_height = 0
+        for path, image in images.items():
+            image_width, image_height = image.get_size()
+            if x and x + image_width > width:
+                x, y, row_height = 0, y + row_height, 0
+            self.regions[path] = pygame.Rect(x, y, image_width, image_height)
+            x += image_width
+            row_height = max(row_height, image_height)
+
+        self.surface = pygame.Surface((width, y + row_height), pygame.SRCALPHA)
+        for path, image in images.items():
+            # MAX onto a fully transparent surface copies RGBA untouched
+            self.surface.blit(image, self.regions[path], special_flags=pygame.BLEND_RGBA_MAX)
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+
+    def __contains__(self, path):
+        return path in self.regions
+
+    def region(self, path):
+        """Source area of a sprite inside the atlas"""
+        return self.regions[path]
+
+    def sprite(self, path):
+        """Standalone view of one sprite (shares the atlas pixels)"""
+        return self.surface.subsurface(self.regions[path])
+
+
+def blit_sprites(screen, sprites, cell_size):
+    """Draw several sprites (anything with sprite_blits) with a single Surface.blits call"""
+    batch = []
+    for sprite in sprites:
+        if sprite:
+            batch.extend(sprite.sprite_blits(cell_size))
+    screen.blits(batch, doreturn=False)
+
+
+class AssetCache:
+    """
+    Process-wide cache of images and sounds keyed by file path.
+
+    Every sprite asks the cache instead of loading from disk, so each file
+    is read once no matter how many snakes or games are created. preload()
+    can decode files on a background thread; convert_alpha() needs a display
+    mode, so images are converted on the first image() call from the game.
+    """
+
+    def __init__(self, text_cache_size=TEXT_CACHE_SIZE):
+        self._images = {}
+        self._raw_images = {}
+        self._sounds = {}
+        self._fonts = {}
+        self._texts = OrderedDict()
+        self.text_cache_size = text_cache_size
+        self._lock = threading.Lock()
+        self._display = None
+
+    def _check_display(self):
+        display = pygame.display.get_surface()
+        if display is not self._display:
+            # A new display (e.g. after pygame.quit) invalidates converted surfaces
+            self._display = display
+            self._images.clear()
+        return display
+
+    def image(self, path):
+        """Return the converted surface for path, loading it the first time"""
+        display = self._check_display()
+        surface = self._images.get(path)
+        if surface is None:
+            with self._lock:
+                raw = self._raw_images.pop(path, None)
+            if raw is None:
+                raw = pygame.image.load(path)
+            surface = raw.convert_alpha() if display is not None else raw
+            self._images[path] = surface
+        return surface
+
+    def atlas(self):
+        """The sprite atlas with every player, fruit and mine image, built once per display"""
+        self._check_display()
+        atlas = self._images.get("atlas")
+        if atlas is None:
+            images, _ = game_asset_paths()
+            with self._lock:
+                raw_images = {path: self._raw_images.pop(path, None) for path in images}
+            atlas = SpriteAtlas({path: raw or pygame.image.load(path) for path, raw in raw_images.items()})
+            self._images["atlas"] = atlas
+        return atlas
+
+    def sprite(self, path):
+        """Surface for path, taken from the atlas when it is packed there"""
+        atlas = self.atlas()
+        if path in atlas:
+            return atlas.sprite(path)
+        return self.image(path)
+
+    def grass(self, cell_number, cell_size, color, base_color):
+        """
+        Checkerboard board background, drawn once and reused every frame.
+        The key includes size and colors, so a resize or theme change simply
+        builds a new surface.
+        """
+        display = self._check_display()
+        key = ("grass", cell_number, cell_size, color, base_color)
+        surface = self._images.get(key)
+        if surface is None:
+            surface = pygame.Surface((cell_number * cell_size, cell_number * cell_size))
+            surface.fill(base_color)
+            for row in range(cell_number):
+                for col in range(row % 2, cell_number, 2):
+                    surface.fill(color, (col * cell_size, row * cell_size, cell_size, cell_size))
+            if display is not None:
+                surface = surface.convert()
+            self._images[key] = surface
+        return surface
+
+    def sound(self, path):
+        """Return the pygame Sound for path, loading it the first time"""
+        with self._lock:
+            sound = self._sounds.get(path)
+        if sound is None:
+            sound = pygame.mixer.Sound(path)
+            with self._lock:
+                sound = self._sounds.setdefault(path, sound)
+        return sound
+
+    def font(self, path=GAME_FONT, size=25):
+        """Return the Font for (path, size), opening the TTF only once (path None is pygame's default font)"""
+        key = (path, size)
+        font = self._fonts.get(key)
+        if font is None:
+            font = pygame.font.Font(path, size)
+            self._fonts[key] = font
+        return font
+
+    def text(self, font, text, color, antialias=True):
+        """
+        Rendered text surface, kept in a small LRU cache keyed by
+        (text, color, font) so static screens never rasterize twice
+        """
+        key = (text, tuple(color), font, antialias)
+        surface = self._texts.get(key)
+        if surface is None:
+            surface = font.render(text, antialias, color)
+            self._texts[key] = surface
+            if len(self._texts) > self.text_cache_size:
+                self._texts.popitem(last=False)
+        else:
+            self._texts.move_to_end(key)
+        return surface
+
+    def preload(self, images=(), sounds=(), background=True):
+        """Decode the given files ahead of time, on a daemon thread by default"""
+        if background:
+            thread = threading.Thread(target=self._preload, args=(list(images), list(sounds)), daemon=True)
+            thread.start()
+            return thread
+        self._preload(images, sounds)
+        return None
+
+    def _preload(self, images, sounds):
+        for path in images:
+            with self._lock:
+                if path in self._raw_images:
+                    continue
+            try:
+                raw = pygame.image.load(path)
+            except (pygame.error, FileNotFoundError) as e:
+                print(f"Could not preload {path}: {e}")
+                continue
+            with self._lock:
+                self._raw_images.setdefault(path, raw)
+
+        if not pygame.mixer.get_init():
+            return
+        for path in sounds:
+            try:
+                self.sound(path)
+            except (pygame.error, FileNotFoundError) as e:
+                print(f"Could not preload {path}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self._raw_images.clear()
+            self._sounds.clear()
+            # Fonts (and text rendered with them) die with pygame.quit()
+            self._fonts.clear()
+            self._texts.clear()
+
+
+# Shared by every sprite in the process
+assets = AssetCache()
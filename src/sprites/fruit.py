@@ -1,24 +1,19 @@
-import random
-import pygame
-from pygame.math import Vector2
-from src.constants import CELL_NUMBER
-import os
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+from src.simulation import GridItem
+from src.sprites.assets import assets, graphics_path
 
-class Fruit:
+class Fruit(GridItem):
     def __init__(self):
         self.randomize()
-        folder_path = os.path.join(BASE_DIR, "..", "assets" ,"graphics")
-        self.apple = pygame.image.load(os.path.join(folder_path, "apple.png")).convert_alpha()
+        atlas = assets.atlas()
+        self.atlas = atlas.surface
+        self.area = atlas.region(graphics_path("apple.png"))
+        self.apple = atlas.sprite(graphics_path("apple.png"))
         
-        self.p1 = pygame.image.load(os.path.join(folder_path, "player1", "head_down.png")).convert_alpha()
-        self.p2 = pygame.image.load(os.path.join(folder_path, "player2", "head_down.png")).convert_alpha()
+        self.p1 = atlas.sprite(graphics_path("player1", "head_down.png"))
+        self.p2 = atlas.sprite(graphics_path("player2", "head_down.png"))
 
     def draw_fruit(self, screen, cell_size):
-        fruit_rect = pygame.Rect(self.pos.x * cell_size, self.pos.y * cell_size, cell_size, cell_size)
-        screen.blit(self.apple, fruit_rect)
-        
-    def randomize(self):
-        self.x = random.randint(0, CELL_NUMBER - 1)
-        self.y = random.randint(0, CELL_NUMBER - 1)
-        self.pos = Vector2(self.x, self.y)
\ No newline at end of file
+        screen.blits(self.sprite_blits(cell_size), doreturn=False)
+
+    def sprite_blits(self, cell_size):
+        return [(self.atlas, (self.x * cell_size, self.y * cell_size), self.area)]
@@ -1,118 +1,142 @@
-import pygame
-from pygame.math import Vector2
-from src.constants import CELL_SIZE
-import os
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-class Snake:
-    def __init__(self, start_position, player_number):
-        self._initialize(start_position, player_number)
-        self.new_block = False
-        
-        # Load snake graphics based on player number
+from collections import deque
+from itertools import islice
+from src.simulation import SnakeState
+from src.sprites.assets import assets, graphics_path, sound_path, SNAKE_PARTS
 
-        self._load_graphics(player_number)
-        folder_path = os.path.join(BASE_DIR, "..", "assets" ,"Sound")
-        # print("________________\n")
-        # print(folder_path)
-        # print("________________")
-        self.crunch_sound = pygame.mixer.Sound(os.path.join(folder_path, "crunch.wav"))
-        self.boom_sound = pygame.mixer.Sound(os.path.join(folder_path, "boom11.wav"))
-        self.hiss_sound = pygame.mixer.Sound(os.path.join(folder_path, "snake_hiss.wav"))
-
-
-    def _initialize(self, start_position, player_number):
-        if player_number == 1:
-            self.body = [Vector2(start_position[0], start_position[1]),
-                         Vector2(start_position[0] - 1, start_position[1]),
-                         Vector2(start_position[0] - 2, start_position[1])]
-            self.direction = Vector2(1, 0)  
-        elif player_number == 2:
-            self.body = [Vector2(start_position[0], start_position[1]),
-                         Vector2(start_position[0] + 1, start_position[1]),
-                         Vector2(start_position[0] + 2, start_position[1])]
-            self.direction = Vector2(-1, 0)
-    
-    def _load_graphics(self, player_number):
-        folder_path = os.path.join(BASE_DIR, "..", "assets", "graphics", f"player{player_number}")
+def _pick_segment_part(previous_block, next_block):
+    """Middle block sprite for the offsets to the previous (tail side) and next (head side) blocks"""
+    if previous_block[0] == next_block[0]:
+        return 'body_vertical'
+    if previous_block[1] == next_block[1]:
+        return 'body_horizontal'
+    if previous_block[0] == -1 and next_block[1] == -1 or previous_block[1] == -1 and next_block[0] == -1:
+        return 'body_tl'
+    if previous_block[0] == -1 and next_block[1] == 1 or previous_block[1] == 1 and next_block[0] == -1:
+        return 'body_bl'
+    if previous_block[0] == 1 and next_block[1] == -1 or previous_block[1] == -1 and next_block[0] == 1:
+        return 'body_tr'
+    if previous_block[0] == 1 and next_block[1] == 1 or previous_block[1] == 1 and next_block[0] == 1:
+        return 'body_br'
+    return None
+
+
+# Every (previous, next) pair of unit offsets, resolved once
+_OFFSETS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+SEGMENT_PARTS = {(previous_block, next_block): _pick_segment_part(previous_block, next_block)
+                 for previous_block in _OFFSETS for next_block in _OFFSETS}
 
-        self.head_up = pygame.image.load(os.path.join(folder_path, "head_up.png")).convert_alpha()
-        self.head_down = pygame.image.load(os.path.join(folder_path, "head_down.png")).convert_alpha()
-        self.head_right = pygame.image.load(os.path.join(folder_path, "head_right.png")).convert_alpha()
-        self.head_left = pygame.image.load(os.path.join(folder_path, "head_left.png")).convert_alpha()
 
-        self.tail_up = pygame.image.load(os.path.join(folder_path, "tail_up.png")).convert_alpha()
-        self.tail_down = pygame.image.load(os.path.join(folder_path, "tail_down.png")).convert_alpha()
-        self.tail_right = pygame.image.load(os.path.join(folder_path, "tail_right.png")).convert_alpha()
-        self.tail_left = pygame.image.load(os.path.join(folder_path, "tail_left.png")).convert_alpha()
+def segment_part(previous_block, next_block):
+    part = SEGMENT_PARTS.get((previous_block, next_block), False)
+    if part is False:
+        # Not adjacent blocks (e.g. a body replaced from the network); same rules, no table
+        part = _pick_segment_part(previous_block, next_block)
+    return part
+
+
+class Snake(SnakeState):
+    def __init__(self, start_position, player_number, direction=None):
+        super().__init__(start_position, player_number, direction)
+        
+        # Load snake graphics based on player number (shared through the asset cache)
+
+        self._load_graphics(player_number)
+        self.crunch_sound = assets.sound(sound_path("crunch.wav"))
+        self.boom_sound = assets.sound(sound_path("boom11.wav"))
+        self.hiss_sound = assets.sound(sound_path("snake_hiss.wav"))
 
-        self.body_vertical = pygame.image.load(os.path.join(folder_path, "body_vertical.png")).convert_alpha()
-        self.body_horizontal = pygame.image.load(os.path.join(folder_path, "body_horizontal.png")).convert_alpha()
+    def _load_graphics(self, player_number):
+        # Every part is an area of the shared sprite atlas, not a surface of its own
+        folder = f"player{player_number}"
+        atlas = assets.atlas()
+        self.atlas = atlas.surface
+        for part in SNAKE_PARTS:
+            setattr(self, part, atlas.region(graphics_path(folder, f"{part}.png")))
 
-        self.body_tr = pygame.image.load(os.path.join(folder_path, "body_tr.png")).convert_alpha()
-        self.body_tl = pygame.image.load(os.path.join(folder_path, "body_tl.png")).convert_alpha()
-        self.body_br = pygame.image.load(os.path.join(folder_path, "body_br.png")).convert_alpha()
-        self.body_bl = pygame.image.load(os.path.join(folder_path, "body_bl.png")).convert_alpha()
+        # Lookup tables: offset to the neighbour block -> head/tail sprite area
+        self.head_sprites = {(1, 0): self.head_left, (-1, 0): self.head_right,
+                             (0, 1): self.head_up, (0, -1): self.head_down}
+        self.tail_sprites = {(1, 0): self.tail_left, (-1, 0): self.tail_right,
+                             (0, 1): self.tail_up, (0, -1): self.tail_down}
+        self.segment_sprites = {part: getattr(self, part) for part in set(SEGMENT_PARTS.values()) if part}
+        self._segments = None
+        self._segments_body = None
+        self._segments_state = None
 
 
     def draw_snake(self, screen, cell_size):
+        screen.blits(self.sprite_blits(cell_size), doreturn=False)
+
+    def sprite_blits(self, cell_size):
+        """(atlas, position, area) triples for Surface.blits, head first"""
         self.update_head_graphics()
         self.update_tail_graphics()
+        segments = self._sync_segments()
+
+        atlas = self.atlas
+        body = self.body
+        head_x, head_y = body[0]
+        blits = [(atlas, (head_x * cell_size, head_y * cell_size), self.head)]
+
+        # Middle blocks: the sprite of each one is already cached
+        sprites = self.segment_sprites
+        blits.extend((atlas, (x * cell_size, y * cell_size), sprites[part])
+                     for (x, y), part in zip(islice(body, 1, None), segments) if part)
+
+        tail_x, tail_y = body[-1]
+        blits.append((atlas, (tail_x * cell_size, tail_y * cell_size), self.tail))
+        return blits
+
+    def _segment_part(self, index):
+        """Sprite name for the middle block at index (cheap near the ends of the deque)"""
+        body = self.body
+        x, y = body[index]
+        previous_x, previous_y = body[index + 1]
+        next_x, next_y = body[index - 1]
+        return segment_part((previous_x - x, previous_y - y), (next_x - x, next_y - y))
 
-        for index, block in enumerate(self.body):
-            x_pos = block.x * cell_size
-            y_pos = block.y * cell_size
-            block_rect = pygame.Rect(x_pos, y_pos, cell_size, cell_size)
-
-            if index == 0:
-                screen.blit(self.head, block_rect)
-            elif index == len(self.body) - 1:
-                screen.blit(self.tail, block_rect)
-            else:
-                previous_block = self.body[index+1] - block
-                next_block = self.body[index-1] - block
-                if previous_block.x == next_block.x:
-                    screen.blit(self.body_vertical, block_rect)
-                elif previous_block.y == next_block.y:
-                    screen.blit(self.body_horizontal, block_rect)
-                else:
-                    if previous_block.x == -1 and next_block.y == -1 or previous_block.y == -1 and next_block.x ==-1:    
-                        screen.blit(self.body_tl, block_rect)
-                    elif previous_block.x == -1 and next_block.y == 1 or previous_block.y == 1 and next_block.x ==-1:    
-                        screen.blit(self.body_bl, block_rect)
-                    elif previous_block.x == 1 and next_block.y == -1 or previous_block.y == -1 and next_block.x ==1:    
-                        screen.blit(self.body_tr, block_rect)
-                    elif previous_block.x == 1 and next_block.y == 1 or previous_block.y == 1 and next_block.x ==1:    
-                        screen.blit(self.body_br, block_rect)
+    def _sync_segments(self):
+        """
+        Keep one cached sprite name per middle block (body[1:-1]).
+
+        The simulation only pushes heads and pops tails on the same deque,
+        so just the blocks next to the old head need a new sprite and the
+        tail end is trimmed. A replaced body (reset, network state) or an
+        unexpected change rebuilds the whole cache.
+        """
+        body = self.body
+        segments = self._segments
+        length = len(body)
+        if body is self._segments_body and segments is not None:
+            old_head, old_length = self._segments_state
+            pushed = next((i for i in range(min(3, length)) if body[i] == old_head), None)
+            if pushed is not None:
+                popped = old_length + pushed - length
+                if 0 <= popped <= len(segments):
+                    for _ in range(popped):
+                        segments.pop()
+                    # The old head (now at index pushed) and any new blocks before it
+                    for index in range(pushed, 0, -1):
+                        if index < length - 1:
+                            segments.appendleft(self._segment_part(index))
+                    if len(segments) == max(0, length - 2):
+                        self._segments_state = (body[0], length)
+                        return segments
+
+        segments = deque(self._segment_part(index) for index in range(1, length - 1))
+        self._segments = segments
+        self._segments_body = body
+        self._segments_state = (body[0], length)
+        return segments
 
     def update_head_graphics(self):
-        head_relation = self.body[1] - self.body[0]
-        if head_relation == Vector2(1, 0): self.head = self.head_left
-        elif head_relation == Vector2(-1, 0): self.head = self.head_right
-        elif head_relation == Vector2(0, 1): self.head = self.head_up
-        elif head_relation == Vector2(0, -1): self.head = self.head_down
+        head_relation = (self.body[1][0] - self.body[0][0], self.body[1][1] - self.body[0][1])
+        self.head = self.head_sprites.get(head_relation, getattr(self, 'head', self.head_right))
     
     def update_tail_graphics(self):
-        tail_relation = self.body[-2] - self.body[-1]
-        if tail_relation == Vector2(1, 0): self.tail = self.tail_left
-        elif tail_relation == Vector2(-1, 0): self.tail = self.tail_right
-        elif tail_relation == Vector2(0, 1): self.tail = self.tail_up
-        elif tail_relation == Vector2(0, -1): self.tail = self.tail_down
-
-    def move_snake(self):
-        if self.new_block:
-            body_copy = self.body[:]
-            body_copy.insert(0, body_copy[0] + self.direction)
-            self.body = body_copy[:]
-            self.new_block = False
-        else:
-            body_copy = self.body[:-1]
-            body_copy.insert(0, body_copy[0] + self.direction)
-            self.body = body_copy[:]
-            
-    def add_block(self):
-        self.new_block = True
-        
+        tail_relation = (self.body[-2][0] - self.body[-1][0], self.body[-2][1] - self.body[-1][1])
+        self.tail = self.tail_sprites.get(tail_relation, getattr(self, 'tail', self.tail_left))
+
     def play_crunch_sound(self):
         self.crunch_sound.play()
 
@@ -121,6 +145,3 @@ class Snake:
     
     def play_hiss_sound(self):
         self.hiss_sound.play()
-        
-    def reset(self, start_position, player_number):
-        self._initialize(start_position, player_number)
\ No newline at end of file
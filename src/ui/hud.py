@@ -0,0 +1,40 @@
+import pygame
+
+
+class HudCache:
+    """
+    Surfaces for the in-game score boxes.
+
+    Scaled player icons are created once and each score or name label keeps
+    its rendered surface until its text (or color) changes, so a
+    steady-state frame only blits. Fonts come from the shared asset registry.
+    """
+
+    def __init__(self):
+        self._icons = {}
+        self._labels = {}
+
+    def icon(self, image, size):
+        """Return image scaled to size, scaling it only the first time"""
+        key = (id(image), size)
+        cached = self._icons.get(key)
+        # Keep a reference to the source so its id cannot be reused
+        if cached is None or cached[0] is not image:
+            cached = (image, pygame.transform.scale(image, size))
+            self._icons[key] = cached
+        return cached[1]
+
+    def label(self, slot, font, text, color):
+        """
+        Rendered text for a HUD slot (e.g. ('score', 2)); re-rendered only
+        when the text, color or font shown in that slot changes
+        """
+        cached = self._labels.get(slot)
+        if cached is None or cached[0] != (font, text, color):
+            cached = ((font, text, color), font.render(text, True, color))
+            self._labels[slot] = cached
+        return cached[1]
+
+    def clear(self):
+        self._icons.clear()
+        self._labels.clear()
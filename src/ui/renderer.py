@@ -0,0 +1,121 @@
+import pygame
+from src.constants import CELL_SIZE
+
+# Events after which the window contents must be pushed again in full
+EXPOSE_EVENTS = {pygame.VIDEOEXPOSE, pygame.VIDEORESIZE,
+                 getattr(pygame, 'WINDOWEXPOSED', pygame.VIDEOEXPOSE),
+                 getattr(pygame, 'WINDOWRESTORED', pygame.VIDEOEXPOSE)}
+
+
+class DirtyRenderer:
+    """
+    Dirty-rectangle presenter for the game loop.
+
+    The board only changes on simulation ticks (or when a network state
+    arrives), yet the loop runs at 60 FPS. Every frame the renderer builds a
+    cheap description of what is on screen; when it matches the previous
+    frame nothing is drawn or presented at all. Otherwise the frame is drawn
+    as usual into the back buffer and only the changed areas are passed to
+    pygame.display.update():
+
+    - cells a snake entered or left, plus the cells whose sprite depends on
+      the moving ends (old head, new tail);
+    - the old and new fruit and mine cells;
+    - the score boxes, when a score or name changed.
+
+    Anything else (a new game state, countdown, window expose) presents the
+    whole screen.
+    """
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self._scene = None
+        self._hud_rects = []
+        self._full_update = True
+
+    def invalidate(self):
+        """Present the whole screen on the next frame"""
+        self._full_update = True
+
+    def handle_event(self, event):
+        if event.type in EXPOSE_EVENTS:
+            self.invalidate()
+
+    def render(self, game, draw_frame):
+        """
+        Draw and present one frame if anything changed.
+        Returns the list of rects passed to display.update (empty when idle).
+        """
+        scene = self._describe(game)
+        previous = self._scene
+        if not self._full_update and scene == previous:
+            return []
+
+        draw_frame(game)
+        hud_rects = list(getattr(game, 'hud_rects', ()))
+
+        if self._full_update or previous is None or scene[0] != previous[0]:
+            rects = [game.screen.get_rect()]
+        else:
+            rects = self._changed_rects(previous, scene, hud_rects)
+            screen_rect = game.screen.get_rect()
+            rects = [rect.clip(screen_rect) for rect in rects]
+            rects = [rect for rect in rects if rect.width and rect.height]
+
+        self._scene = scene
+        self._hud_rects = hud_rects
+        self._full_update = False
+        if rects:
+            pygame.display.update(rects)
+        return rects
+
+    def _describe(self, game):
+        """
+        Everything that affects the picture. The first item changes on any
+        screen switch (state, countdown, winner, lobby info) and forces a
+        full update; the rest is diffed cell by cell.
+        """
+        state = (
+            game.game_state,
+            getattr(game, 'countdown', None),
+            getattr(game, 'winner', None),
+            getattr(game, 'connection_status', None),
+            getattr(game, 'game_can_start', None),
+            getattr(getattr(game, 'client', None), 'connected_players', None),
+        )
+        snakes = {player: tuple(snake.body) for player, snake in game.simulation.snakes.items() if snake}
+        names = getattr(game, 'player_names', None)
+        hud = tuple(sorted(names.items())) if names else None
+        return (state, snakes, game.fruit.pos, game.mine.pos, hud)
+
+    def _changed_rects(self, previous, scene, hud_rects):
+        _, old_snakes, old_fruit, old_mine, old_hud = previous
+        _, new_snakes, new_fruit, new_mine, new_hud = scene
+
+        cells = set()
+        scores_changed = old_hud != new_hud
+        for player in old_snakes.keys() | new_snakes.keys():
+            old_body = old_snakes.get(player, ())
+            new_body = new_snakes.get(player, ())
+            if old_body == new_body:
+                continue
+            if len(old_body) != len(new_body):
+                scores_changed = True
+            cells.update(set(old_body) ^ set(new_body))
+            # The old head becomes a body segment and a new tail is drawn
+            cells.update(new_body[:2])
+            cells.update(new_body[-1:])
+            cells.update(old_body[:1])
+            cells.update(old_body[-1:])
+
+        if old_fruit != new_fruit:
+            cells.update((old_fruit, new_fruit))
+        if old_mine != new_mine:
+            cells.update((old_mine, new_mine))
+
+        size = self.cell_size
+        rects = [pygame.Rect(x * size, y * size, size, size) for x, y in cells]
+        if scores_changed:
+            rects.extend(self._hud_rects)
+            rects.extend(hud_rects)
+        return rects